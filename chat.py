@@ -10,8 +10,11 @@ Commands:
     /stats   - Show session statistics
     /exit    - Exit the chat
 """
+import argparse
 import asyncio
 import sys
+import time
+import traceback
 from pathlib import Path
 from typing import Optional
 from uuid import UUID
@@ -30,8 +33,38 @@ from src.infrastructure.utils.cli_colors import (
     format_tool_call, format_tool_success, format_tool_error,
     Colors, dim, draw_separator
 )
+from src.infrastructure.utils.event_loop import run
 from src.skills.initialize import initialize_all_tools
 
+# 流式输出的最长 flush 间隔（秒）
+STREAM_FLUSH_INTERVAL = 0.02
+
+# GauzAssist ASCII logo with gradient colors
+_WELCOME_LOGO = "\n".join([
+    f"{Colors.BRIGHT_MAGENTA}   ██████{Colors.BRIGHT_CYAN}╗ {Colors.BRIGHT_MAGENTA} █████{Colors.BRIGHT_CYAN}╗ {Colors.BRIGHT_MAGENTA}██{Colors.BRIGHT_CYAN}╗   {Colors.BRIGHT_MAGENTA}██{Colors.BRIGHT_CYAN}╗{Colors.BRIGHT_MAGENTA}███████{Colors.BRIGHT_CYAN}╗ {Colors.RESET}",
+    f"{Colors.BRIGHT_MAGENTA}  ██{Colors.BRIGHT_CYAN}╔════╝ {Colors.BRIGHT_MAGENTA}██{Colors.BRIGHT_CYAN}╔══{Colors.BRIGHT_MAGENTA}██{Colors.BRIGHT_CYAN}╗{Colors.BRIGHT_MAGENTA}██{Colors.BRIGHT_CYAN}║   {Colors.BRIGHT_MAGENTA}██{Colors.BRIGHT_CYAN}║{Colors.BRIGHT_MAGENTA}╚══███{Colors.BRIGHT_CYAN}╔╝{Colors.RESET}",
+    f"{Colors.BRIGHT_CYAN}  ██{Colors.BRIGHT_BLUE}║  {Colors.BRIGHT_CYAN}███{Colors.BRIGHT_BLUE}╗{Colors.BRIGHT_CYAN}███████{Colors.BRIGHT_BLUE}║{Colors.BRIGHT_CYAN}██{Colors.BRIGHT_BLUE}║   {Colors.BRIGHT_CYAN}██{Colors.BRIGHT_BLUE}║  {Colors.BRIGHT_CYAN}███{Colors.BRIGHT_BLUE}╔╝ {Colors.RESET}",
+    f"{Colors.BRIGHT_CYAN}  ██{Colors.BRIGHT_BLUE}║   {Colors.BRIGHT_CYAN}██{Colors.BRIGHT_BLUE}║{Colors.BRIGHT_CYAN}██{Colors.BRIGHT_BLUE}╔══{Colors.BRIGHT_CYAN}██{Colors.BRIGHT_BLUE}║{Colors.BRIGHT_CYAN}██{Colors.BRIGHT_BLUE}║   {Colors.BRIGHT_CYAN}██{Colors.BRIGHT_BLUE}║ {Colors.BRIGHT_CYAN}███{Colors.BRIGHT_BLUE}╔╝  {Colors.RESET}",
+    f"{Colors.BRIGHT_BLUE}  ╚██████{Colors.BLUE}╔╝{Colors.BRIGHT_BLUE}██{Colors.BLUE}║  {Colors.BRIGHT_BLUE}██{Colors.BLUE}║{Colors.BRIGHT_BLUE}╚██████{Colors.BLUE}╔╝{Colors.BRIGHT_BLUE}███████{Colors.BLUE}╗{Colors.RESET}",
+    f"{Colors.BLUE}   ╚═════╝ ╚═╝  ╚═╝ ╚═════╝ ╚══════╝{Colors.RESET}",
+])
+
+_HELP_TEXT = "\n".join([
+    "\n可用命令：",
+    "  /help    - 显示此帮助信息",
+    "  /clear   - 清除对话历史",
+    "  /stats   - 显示会话统计",
+    "  /exit    - 退出聊天",
+    "\n多行输入：",
+    "  • 按 Enter 键提交消息",
+    "  • 粘贴多行文本会完整保留所有换行",
+    "\n示例对话：",
+    "  • 我想做一个个人财务管理工具",
+    "  • 找一下关于学习的想法",
+    "  • 帮我整理最近的想法",
+    "",
+]) + "\n"
+
 
 class ChatInterface:
     """Interactive chat interface for the agent."""
@@ -45,17 +78,33 @@ class ChatInterface:
                          If False, use deepseek-chat (faster, no thinking).
             fixed_skill_id: If provided, always use this skill ID instead of LLM selection.
         """
-        self.session_id = None
+        self.session_id: Optional[UUID] = None
         self.message_count = 0
         self.db = None
         self.agent = None
         self.use_reasoner = use_reasoner
         self.fixed_skill_id = fixed_skill_id
 
+        # Static prefixes are formatted once instead of per streamed turn
+        self._thinking_prefix = format_thinking_prefix()
+        self._assistant_prefix = format_assistant_prefix()
+
         # Initialize prompt_toolkit session
         self.prompt_session = PromptSession()
         self.key_bindings = self._setup_key_bindings()
 
+        # Streaming output state (reset before each turn)
+        self._assistant_started = False
+        self._last_flush = time.monotonic()
+
+        # Command dispatch table: command -> (handler, should_continue)
+        self._commands = {
+            "/help": (self.print_help, True),
+            "/clear": (self._clear_history, True),
+            "/stats": (self.print_stats, True),
+            "/exit": (self._print_goodbye, False),
+        }
+
     def _setup_key_bindings(self):
         """Setup key bindings for multi-line input."""
         bindings = KeyBindings()
@@ -72,13 +121,7 @@ class ChatInterface:
         # Clear screen effect with some spacing
         print("\n" * 2)
 
-        # GauzAssist ASCII logo with gradient colors
-        print(f"{Colors.BRIGHT_MAGENTA}   ██████{Colors.BRIGHT_CYAN}╗ {Colors.BRIGHT_MAGENTA} █████{Colors.BRIGHT_CYAN}╗ {Colors.BRIGHT_MAGENTA}██{Colors.BRIGHT_CYAN}╗   {Colors.BRIGHT_MAGENTA}██{Colors.BRIGHT_CYAN}╗{Colors.BRIGHT_MAGENTA}███████{Colors.BRIGHT_CYAN}╗ {Colors.RESET}")
-        print(f"{Colors.BRIGHT_MAGENTA}  ██{Colors.BRIGHT_CYAN}╔════╝ {Colors.BRIGHT_MAGENTA}██{Colors.BRIGHT_CYAN}╔══{Colors.BRIGHT_MAGENTA}██{Colors.BRIGHT_CYAN}╗{Colors.BRIGHT_MAGENTA}██{Colors.BRIGHT_CYAN}║   {Colors.BRIGHT_MAGENTA}██{Colors.BRIGHT_CYAN}║{Colors.BRIGHT_MAGENTA}╚══███{Colors.BRIGHT_CYAN}╔╝{Colors.RESET}")
-        print(f"{Colors.BRIGHT_CYAN}  ██{Colors.BRIGHT_BLUE}║  {Colors.BRIGHT_CYAN}███{Colors.BRIGHT_BLUE}╗{Colors.BRIGHT_CYAN}███████{Colors.BRIGHT_BLUE}║{Colors.BRIGHT_CYAN}██{Colors.BRIGHT_BLUE}║   {Colors.BRIGHT_CYAN}██{Colors.BRIGHT_BLUE}║  {Colors.BRIGHT_CYAN}███{Colors.BRIGHT_BLUE}╔╝ {Colors.RESET}")
-        print(f"{Colors.BRIGHT_CYAN}  ██{Colors.BRIGHT_BLUE}║   {Colors.BRIGHT_CYAN}██{Colors.BRIGHT_BLUE}║{Colors.BRIGHT_CYAN}██{Colors.BRIGHT_BLUE}╔══{Colors.BRIGHT_CYAN}██{Colors.BRIGHT_BLUE}║{Colors.BRIGHT_CYAN}██{Colors.BRIGHT_BLUE}║   {Colors.BRIGHT_CYAN}██{Colors.BRIGHT_BLUE}║ {Colors.BRIGHT_CYAN}███{Colors.BRIGHT_BLUE}╔╝  {Colors.RESET}")
-        print(f"{Colors.BRIGHT_BLUE}  ╚██████{Colors.BLUE}╔╝{Colors.BRIGHT_BLUE}██{Colors.BLUE}║  {Colors.BRIGHT_BLUE}██{Colors.BLUE}║{Colors.BRIGHT_BLUE}╚██████{Colors.BLUE}╔╝{Colors.BRIGHT_BLUE}███████{Colors.BLUE}╗{Colors.RESET}")
-        print(f"{Colors.BLUE}   ╚═════╝ ╚═╝  ╚═╝ ╚═════╝ ╚══════╝{Colors.RESET}")
+        print(_WELCOME_LOGO)
 
         # Subtitle with mode indicator
         mode_text = "Reasoner" if self.use_reasoner else "Chat"
@@ -95,64 +138,82 @@ class ChatInterface:
 
     def print_help(self):
         """Print help message."""
-        print("\n可用命令：")
-        print("  /help    - 显示此帮助信息")
-        print("  /clear   - 清除对话历史")
-        print("  /stats   - 显示会话统计")
-        print("  /exit    - 退出聊天")
-        print("\n多行输入：")
-        print("  • 按 Enter 键提交消息")
-        print("  • 粘贴多行文本会完整保留所有换行")
-        print("\n示例对话：")
-        print("  • 我想做一个个人财务管理工具")
-        print("  • 找一下关于学习的想法")
-        print("  • 帮我整理最近的想法")
-        print()
+        sys.stdout.write(_HELP_TEXT)
 
     def print_stats(self):
         """Print session statistics."""
         print(f"\n📊 会话统计：")
-        print(f"  会话 ID: {str(self.session_id)[:8]}..." if self.session_id else "  会话 ID: 未创建")
+        print(f"  会话 ID: {self.session_id.hex[:8]}..." if self.session_id else "  会话 ID: 未创建")
         print(f"  消息数量: {self.message_count}")
         print()
 
-    async def process_command(self, command: str) -> bool:
+    def _clear_history(self):
+        """Clear conversation history."""
+        # 删除旧的 session（避免内存泄漏）
+        if self.session_id and self.agent:
+            from src.core.agent.state import get_session_manager
+            session_manager = get_session_manager()
+            session_manager.delete_session(self.session_id)
+
+        self.session_id = None
+        self.message_count = 0
+        print("\n✓ 对话历史已清除\n")
+
+    def _print_goodbye(self):
+        """Print exit message."""
+        print("\n👋 再见！\n")
+
+    def process_command(self, command: str) -> bool:
         """
         Process special commands.
 
         Returns:
             True if should continue, False if should exit
         """
-        if command == "/help":
-            self.print_help()
-            return True
-
-        elif command == "/clear":
-            # 删除旧的 session（避免内存泄漏）
-            if self.session_id and self.agent:
-                from src.core.agent.state import get_session_manager
-                session_manager = get_session_manager()
-                from uuid import UUID
-                session_manager.delete_session(UUID(self.session_id))
-
-            self.session_id = None
-            self.message_count = 0
-            print("\n✓ 对话历史已清除\n")
-            return True
-
-        elif command == "/stats":
-            self.print_stats()
-            return True
-
-        elif command == "/exit":
-            print("\n👋 再见！\n")
-            return False
-
-        else:
+        entry = self._commands.get(command)
+        if entry is None:
             print(f"\n❌ 未知命令: {command}")
             print("输入 /help 查看可用命令\n")
             return True
 
+        handler, should_continue = entry
+        handler()
+        return should_continue
+
+    def _write(self, text: str, force_flush: bool = False):
+        """Write streamed output, flushing on newlines or every STREAM_FLUSH_INTERVAL."""
+        sys.stdout.write(text)
+        now = time.monotonic()
+        if force_flush or "\n" in text or now - self._last_flush >= STREAM_FLUSH_INTERVAL:
+            sys.stdout.flush()
+            self._last_flush = now
+
+    def _stream_callback(self, msg_type: str, content: str):
+        """Render streamed agent events to the terminal."""
+        if msg_type == 'thinking':
+            if not self._assistant_started:
+                self._write(f"{self._thinking_prefix} ")
+                self._assistant_started = True
+            self._write(dim(content))
+
+        elif msg_type == 'content':
+            if not self._assistant_started:
+                self._write(f"{self._assistant_prefix} ")
+                self._assistant_started = True
+            self._write(content)
+
+        elif msg_type == 'tool_call':
+            self._write(format_tool_call(content), force_flush=True)
+
+        elif msg_type == 'tool_result':
+            # 判断是成功还是失败
+            if '✓' in content:
+                self._write(f" {format_tool_success(content)}", force_flush=True)
+            elif '✗' in content:
+                self._write(f" {format_tool_error(content)}", force_flush=True)
+            else:
+                self._write(f" {content}", force_flush=True)
+
     async def chat_loop(self):
         """Main chat loop."""
         self.print_welcome()
@@ -185,7 +246,7 @@ class ChatInterface:
 
                     # Handle commands
                     if user_input.startswith("/"):
-                        should_continue = await self.process_command(user_input)
+                        should_continue = self.process_command(user_input)
                         if not should_continue:
                             break
                         continue
@@ -194,51 +255,25 @@ class ChatInterface:
                     print()  # New line before response
 
                     # Simplified state tracking
-                    assistant_started = False
-
-                    def stream_callback(msg_type: str, content: str):
-                        nonlocal assistant_started
-
-                        if msg_type == 'thinking':
-                            if not assistant_started:
-                                print(format_thinking_prefix(), end=" ", flush=True)
-                                assistant_started = True
-                            print(dim(content), end="", flush=True)
-
-                        elif msg_type == 'content':
-                            if not assistant_started:
-                                print(format_assistant_prefix(), end=" ", flush=True)
-                                assistant_started = True
-                            print(content, end="", flush=True)
-
-                        elif msg_type == 'tool_call':
-                            print(format_tool_call(content), end="", flush=True)
-
-                        elif msg_type == 'tool_result':
-                            # 判断是成功还是失败
-                            if '✓' in content:
-                                print(f" {format_tool_success(content)}", end="", flush=True)
-                            elif '✗' in content:
-                                print(f" {format_tool_error(content)}", end="", flush=True)
-                            else:
-                                print(f" {content}", end="", flush=True)
+                    self._assistant_started = False
 
                     try:
                         response = await self.agent.process_message(
                             user_input,
-                            session_id=UUID(self.session_id) if self.session_id else None,
-                            stream_callback=stream_callback
+                            session_id=self.session_id,
+                            stream_callback=self._stream_callback
                         )
+                        sys.stdout.flush()
 
                         # Update session info
                         if not self.session_id:
-                            self.session_id = response["session_id"]
+                            self.session_id = UUID(response["session_id"])
 
                         self.message_count += 1
 
                         # Print response only if not streamed
-                        if not assistant_started and response["success"]:
-                            print(f"{format_assistant_prefix()} {response['text']}")
+                        if not self._assistant_started and response["success"]:
+                            print(f"{self._assistant_prefix} {response['text']}")
                         elif not response["success"]:
                             error_msg = f"❌ 错误: {response.get('error', '未知错误')}"
                             print(f"\n{Colors.RED}{error_msg}{Colors.RESET}")
@@ -248,8 +283,8 @@ class ChatInterface:
 
                     except Exception as e:
                         print(f"\n❌ 处理消息时出错: {str(e)}")
-                        import traceback
-                        traceback.print_exc()
+                        # exc_info is per-thread, so hand the exception over explicitly
+                        await asyncio.to_thread(traceback.print_exception, e)
                         print("\n", end="", flush=True)
 
                     # Commit after each successful interaction
@@ -258,12 +293,12 @@ class ChatInterface:
             except Exception as e:
                 print(f"\n❌ 发生错误: {str(e)}")
                 await db.rollback()
+            finally:
+                await self.agent.close()
 
 
 def main():
     """Main entry point."""
-    import argparse
-
     # Initialize all skill tools
     initialize_all_tools()
 
@@ -282,7 +317,7 @@ def main():
 
     chat = ChatInterface(use_reasoner=args.reasoner, fixed_skill_id=args.skill)
     try:
-        asyncio.run(chat.chat_loop())
+        run(chat.chat_loop())
     except KeyboardInterrupt:
         print("\n\n👋 再见！\n")
 
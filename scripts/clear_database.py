@@ -4,10 +4,10 @@
 运行方式：
 PYTHONPATH=/Users/zhuhanyuan/Documents/chatbot python scripts/clear_database.py
 """
-import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from src.infrastructure.database.connection import engine
+from src.infrastructure.utils.event_loop import run
 
 
 async def clear_all_data():
@@ -16,7 +16,6 @@ async def clear_all_data():
 
     async with AsyncSession(engine) as session:
         try:
-            # 按照依赖顺序删除
             tables = [
                 "task_tags",
                 "conversations",
@@ -26,10 +25,16 @@ async def clear_all_data():
                 "mem_source"
             ]
 
+            # 一次查询统计各表记录数，再用单条 TRUNCATE 清空全部表
+            # （不加 CASCADE，避免误清空列表外的关联表）
+            count_columns = ", ".join(f"(SELECT count(*) FROM {table}) AS {table}" for table in tables)
+            result = await session.execute(text(f"SELECT {count_columns}"))
+            counts = result.mappings().one()
+
+            await session.execute(text(f"TRUNCATE TABLE {', '.join(tables)}"))
+
             for table in tables:
-                result = await session.execute(text(f"DELETE FROM {table}"))
-                count = result.rowcount
-                print(f"✓ 清空 {table}: {count} 条记录")
+                print(f"✓ 清空 {table}: {counts[table]} 条记录")
 
             await session.commit()
             print("\n✅ 数据库清空完成！")
@@ -40,4 +45,4 @@ async def clear_all_data():
 
 
 if __name__ == "__main__":
-    asyncio.run(clear_all_data())
+    run(clear_all_data())
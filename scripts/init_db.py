@@ -1,7 +1,6 @@
 """
 Script to initialize the database and create initial migration.
 """
-import asyncio
 import sys
 from pathlib import Path
 
@@ -9,6 +8,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.infrastructure.database.connection import init_db
+from src.infrastructure.utils.event_loop import run
 
 
 async def main():
@@ -25,4 +25,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
@@ -4,27 +4,50 @@ Render zoomed text hotspots for a DXF file and generate a markdown preview.
 """
 
 import argparse
+import hashlib
 import json
-import math
 import os
+import pickle
 import sys
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
 
-import ezdxf
+import numpy as np
+from ezdxf.filemanagement import dxf_file_info
+from ezdxf.lldxf.tagger import ascii_tags_loader
 from ezdxf.tools.text import plain_mtext
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from src.services.cad_agent_tools import get_cad_metadata
-from src.services.cad_renderer import decode_cad_text, render_drawing_region
+from src.services.cad_renderer import decode_cad_text, load_dxf, render_drawing_region
 
+CACHE_DIR = Path("workspace/cache")
+# Bump when the cached (bounds, text_points) layout changes.
+CACHE_VERSION = 2
 
-def iter_entities(msp) -> Iterable:
+
+def find_text_blocks(doc) -> FrozenSet[str]:
+    """Upper-cased names of block definitions that directly contain TEXT/MTEXT."""
+    return frozenset(
+        block.name.upper()
+        for block in doc.blocks
+        if any(e.dxftype() in ("TEXT", "MTEXT") for e in block)
+    )
+
+
+def iter_entities(msp, text_blocks: Optional[FrozenSet[str]] = None) -> Iterable:
     for entity in msp:
         if entity.dxftype() == "INSERT":
+            # virtual_entities() materializes every sub-entity of the block;
+            # skip it for blocks that cannot contribute any text.
+            if text_blocks is not None and entity.dxf.name.upper() not in text_blocks:
+                yield entity
+                continue
             try:
                 for sub_entity in entity.virtual_entities():
                     yield sub_entity
@@ -37,12 +60,139 @@ def clamp(value: float, low: float, high: float) -> float:
     return max(low, min(high, value))
 
 
-def collect_text_points(file_path: str) -> List[Dict]:
-    doc = ezdxf.readfile(file_path)
+# Drawings repeat the same labels (grid tags, callouts) many times over;
+# memoize decoding per raw string.
+@lru_cache(maxsize=65536)
+def _clean_text(raw: str) -> str:
+    return decode_cad_text(raw).replace("\x00", "").strip()
+
+
+@lru_cache(maxsize=65536)
+def _clean_mtext(raw: str) -> str:
+    return _clean_text(plain_mtext(raw))
+
+
+@dataclass
+class TextPoints:
+    """Decoded text insert points as parallel arrays (x, y hot; text cold)."""
+    xs: np.ndarray
+    ys: np.ndarray
+    texts: List[str]
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+
+def _raw_text_value(entity_type: str, tags: List[Tuple[int, str]]) -> str:
+    if entity_type == "TEXT":
+        return next((value for code, value in tags if code == 1), "")
+    # MTEXT content is split into 250-char group 3 chunks followed by group 1.
+    return "".join(value for code, value in tags if code == 3) + next(
+        (value for code, value in tags if code == 1), ""
+    )
+
+
+def scan_text_points(file_path: str) -> Optional[TextPoints]:
+    """
+    Collect model-space TEXT/MTEXT straight from the ASCII tag stream, without
+    building DXFEntity objects for the (mostly non-text) rest of the drawing.
+
+    Returns None when the tag scan cannot reproduce collect_text_points: binary
+    DXF, or a model-space INSERT of a block containing text, which needs the
+    full document for virtual_entities().
+    """
+    try:
+        encoding = dxf_file_info(file_path).encoding
+        with open(file_path, "rt", encoding=encoding, errors="ignore") as stream:
+            return _scan_text_tags(ascii_tags_loader(stream))
+    except Exception:
+        return None
+
+
+def _scan_text_tags(tags: Iterable) -> Optional[TextPoints]:
+    xs: List[float] = []
+    ys: List[float] = []
+    texts: List[str] = []
+    text_blocks = set()
+
+    section = None
+    block_name = ""
+    entity_type = None
+    entity_tags: List[Tuple[int, str]] = []
+
+    def flush() -> None:
+        if any(code == 67 and value.strip() == "1" for code, value in entity_tags):
+            return  # Paper space entity.
+        try:
+            x = float(next(v for c, v in entity_tags if c == 10))
+            y = float(next(v for c, v in entity_tags if c == 20))
+        except (StopIteration, ValueError):
+            return
+        raw = _raw_text_value(entity_type, entity_tags)
+        try:
+            text = _clean_text(raw) if entity_type == "TEXT" else _clean_mtext(raw)
+        except Exception:
+            text = ""
+        if text:
+            xs.append(x)
+            ys.append(y)
+            texts.append(text)
+
+    expect_section_name = False
+    for code, value in tags:
+        if code == 0:
+            if entity_type in ("TEXT", "MTEXT"):
+                flush()
+            elif entity_type == "INSERT":
+                name = next((v for c, v in entity_tags if c == 2), "")
+                if name.upper() in text_blocks:
+                    return None
+            entity_type = None
+            entity_tags = []
+
+            if value == "SECTION":
+                expect_section_name = True
+            elif value == "ENDSEC":
+                section = None
+            elif section == "BLOCKS":
+                if value == "BLOCK":
+                    entity_type = "BLOCK"
+                    block_name = ""
+                elif value in ("TEXT", "MTEXT") and block_name:
+                    text_blocks.add(block_name.upper())
+            elif section == "ENTITIES" and value in ("TEXT", "MTEXT", "INSERT"):
+                entity_type = value
+            continue
+
+        if expect_section_name:
+            section = value if code == 2 else None
+            expect_section_name = False
+        elif entity_type == "BLOCK":
+            if code == 2:
+                block_name = value
+        elif entity_type is not None:
+            entity_tags.append((code, value))
+
+    return TextPoints(
+        xs=np.asarray(xs, dtype=np.float64),
+        ys=np.asarray(ys, dtype=np.float64),
+        texts=texts,
+    )
+
+
+def collect_text_points(file_path: str) -> TextPoints:
+    scanned = scan_text_points(file_path)
+    if scanned is not None:
+        return scanned
+
+    # Shares the parse made by get_cad_metadata in load_text_points.
+    doc = load_dxf(file_path)
     msp = doc.modelspace()
 
-    points: List[Dict] = []
-    for entity in iter_entities(msp):
+    xs: List[float] = []
+    ys: List[float] = []
+    texts: List[str] = []
+    for entity in iter_entities(msp, text_blocks=find_text_blocks(doc)):
         entity_type = entity.dxftype()
         if entity_type not in ("TEXT", "MTEXT"):
             continue
@@ -55,29 +205,49 @@ def collect_text_points(file_path: str) -> List[Dict]:
 
         try:
             if entity_type == "TEXT":
-                raw = entity.dxf.text
+                text = _clean_text(entity.dxf.text)
             else:
-                raw = plain_mtext(entity.text)
-            text = decode_cad_text(raw).replace("\x00", "").strip()
+                text = _clean_mtext(entity.text)
         except Exception:
             text = ""
 
         if not text:
             continue
 
-        points.append(
-            {
-                "x": x,
-                "y": y,
-                "text": text,
-            }
-        )
+        xs.append(x)
+        ys.append(y)
+        texts.append(text)
+
+    return TextPoints(
+        xs=np.asarray(xs, dtype=np.float64),
+        ys=np.asarray(ys, dtype=np.float64),
+        texts=texts,
+    )
 
-    return points
+
+def iter_ranked_cells(cells: np.ndarray, counts: np.ndarray, head_size: int) -> Iterable[int]:
+    """
+    Yield cell indices ordered by (count, gx, gy) descending.
+
+    Only the cells tied with or above the head_size-th largest count are sorted
+    up front (np.partition is O(C)); the tail is sorted lazily if reached.
+    """
+    def ranked(idx: np.ndarray) -> np.ndarray:
+        return idx[np.lexsort((cells[idx, 1], cells[idx, 0], counts[idx]))[::-1]]
+
+    total = len(counts)
+    if total <= head_size:
+        yield from ranked(np.arange(total))
+        return
+
+    threshold = np.partition(counts, total - head_size)[total - head_size]
+    head = counts >= threshold
+    yield from ranked(np.flatnonzero(head))
+    yield from ranked(np.flatnonzero(~head))
 
 
 def pick_hotspot_centers(
-    text_points: List[Dict],
+    text_points: TextPoints,
     bounds: Dict[str, float],
     max_regions: int,
 ) -> List[Tuple[float, float, int]]:
@@ -87,29 +257,25 @@ def pick_hotspot_centers(
     cell_w = max(width / 30.0, 2000.0)
     cell_h = max(height / 20.0, 2000.0)
 
-    grid = defaultdict(list)
-    for idx, p in enumerate(text_points):
-        gx = int((p["x"] - min_x) // cell_w)
-        gy = int((p["y"] - min_y) // cell_h)
-        grid[(gx, gy)].append(idx)
-
-    ranked = sorted(
-        (
-            (len(idxs), gx, gy, idxs)
-            for (gx, gy), idxs in grid.items()
-        ),
-        reverse=True,
-    )
+    gx_all = np.floor_divide(text_points.xs - min_x, cell_w).astype(np.int64)
+    gy_all = np.floor_divide(text_points.ys - min_y, cell_h).astype(np.int64)
+    cells, counts = np.unique(np.column_stack((gx_all, gy_all)), axis=0, return_counts=True)
 
     selected: List[Tuple[float, float, int]] = []
-    min_dist = max(cell_w, cell_h) * 1.8
-    for count, gx, gy, _idxs in ranked:
+    # Compare squared distances; no sqrt needed for a threshold test.
+    min_dist_sq = (max(cell_w, cell_h) * 1.8) ** 2
+    # Oversample so the distance suppression rarely needs the rest of the ranking.
+    for cell_idx in iter_ranked_cells(cells, counts, head_size=max_regions * 8):
+        count = int(counts[cell_idx])
+        gx, gy = int(cells[cell_idx, 0]), int(cells[cell_idx, 1])
         cx = min_x + (gx + 0.5) * cell_w
         cy = min_y + (gy + 0.5) * cell_h
 
         keep = True
         for sx, sy, _ in selected:
-            if math.hypot(cx - sx, cy - sy) < min_dist:
+            dx = cx - sx
+            dy = cy - sy
+            if dx * dx + dy * dy < min_dist_sq:
                 keep = False
                 break
         if not keep:
@@ -119,10 +285,10 @@ def pick_hotspot_centers(
         if len(selected) >= max_regions:
             break
 
-    if not selected and text_points:
+    if not selected and len(text_points):
         # Fallback to one central text point when density grouping fails.
-        p = text_points[len(text_points) // 2]
-        selected.append((p["x"], p["y"], 1))
+        mid = len(text_points) // 2
+        selected.append((float(text_points.xs[mid]), float(text_points.ys[mid]), 1))
 
     return selected
 
@@ -150,35 +316,62 @@ def make_zoom_bbox(
     return {"x": round(x, 2), "y": round(y, 2), "width": round(zoom_w, 2), "height": round(zoom_h, 2)}
 
 
-def sample_texts_in_bbox(text_points: List[Dict], bbox: Dict[str, float], limit: int = 8) -> List[str]:
+def build_text_index(text_points: TextPoints) -> Tuple[np.ndarray, np.ndarray]:
+    """Sort point indices by x so bbox lookups can binary-search the x range."""
+    order = np.argsort(text_points.xs, kind="stable")
+    return order, text_points.xs[order]
+
+
+def sample_texts_in_bbox(
+    text_points: TextPoints,
+    bbox: Dict[str, float],
+    limit: int = 8,
+    index: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> List[str]:
     x1, y1 = bbox["x"], bbox["y"]
     x2, y2 = x1 + bbox["width"], y1 + bbox["height"]
 
+    if index is None:
+        index = build_text_index(text_points)
+    order, sorted_xs = index
+    lo = np.searchsorted(sorted_xs, x1, side="left")
+    hi = np.searchsorted(sorted_xs, x2, side="right")
+    # Restore original point order so samples stay stable.
+    candidates = np.sort(order[lo:hi])
+    candidate_ys = text_points.ys[candidates]
+    candidates = candidates[(candidate_ys >= y1) & (candidate_ys <= y2)]
+
     hits = []
-    for p in text_points:
-        if x1 <= p["x"] <= x2 and y1 <= p["y"] <= y2:
-            text = p["text"].replace("\n", " ").strip()
-            if text:
-                hits.append(text)
-
-    seen = set()
-    unique = []
-    for text in hits:
-        if text in seen:
-            continue
-        seen.add(text)
-        unique.append(text[:80])
-        if len(unique) >= limit:
-            break
-    return unique
+    for idx in candidates:
+        text = text_points.texts[idx].replace("\n", " ").strip()
+        if text:
+            hits.append(text)
 
+    # Dedup on the full text (insertion-ordered), truncate for display afterwards.
+    return [text[:80] for text in list(dict.fromkeys(hits))[:limit]]
+
+
+def _cache_path(file_path: str) -> Path:
+    stat = os.stat(file_path)
+    raw_key = f"{CACHE_VERSION}:{os.path.abspath(file_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+    return CACHE_DIR / f"text_points_{hashlib.sha1(raw_key.encode()).hexdigest()}.pkl"
+
+
+def load_text_points(file_path: str) -> Dict:
+    """
+    Load drawing bounds and decoded text points, reusing an on-disk cache
+    keyed by file path + mtime + size so re-runs skip the DXF parse.
+    """
+    cache_path = _cache_path(file_path) if os.path.exists(file_path) else None
+    if cache_path is not None and cache_path.exists():
+        try:
+            with cache_path.open("rb") as f:
+                bounds, xs, ys, texts = pickle.load(f)
+            text_points = TextPoints(xs=xs, ys=ys, texts=texts)
+            return {"success": True, "bounds": bounds, "text_points": text_points}
+        except Exception:
+            pass  # Corrupt/stale cache: fall through and rebuild it.
 
-def render_hotspots(
-    file_path: str,
-    output_size: int,
-    max_regions: int,
-    zoom_scale: float,
-) -> Dict:
     meta = get_cad_metadata(file_path)
     if not meta.get("success"):
         return {"success": False, "error": meta.get("error", "metadata failed")}
@@ -191,6 +384,32 @@ def render_hotspots(
     if not text_points:
         return {"success": False, "error": "No decoded TEXT/MTEXT found"}
 
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with cache_path.open("wb") as f:
+            # Plain tuple rather than TextPoints so the pickle does not depend on __main__.
+            payload = (bounds, text_points.xs, text_points.ys, text_points.texts)
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    return {"success": True, "bounds": bounds, "text_points": text_points}
+
+
+def render_hotspots(
+    file_path: str,
+    output_size: int,
+    max_regions: int,
+    zoom_scale: float,
+    loaded: Optional[Dict] = None,
+    executor: Optional[ProcessPoolExecutor] = None,
+) -> Dict:
+    if loaded is None:
+        loaded = load_text_points(file_path)
+    if not loaded.get("success"):
+        return loaded
+
+    bounds = loaded["bounds"]
+    text_points = loaded["text_points"]
+    text_index = build_text_index(text_points)
     centers = pick_hotspot_centers(text_points, bounds, max_regions=max_regions)
     if not centers:
         return {"success": False, "error": "No text hotspots selected"}
@@ -198,18 +417,51 @@ def render_hotspots(
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_dir = Path("workspace/rendered/hotspots")
     output_dir.mkdir(parents=True, exist_ok=True)
+    stem = Path(file_path).stem
+    size_tuple = (output_size, output_size)
 
-    hotspot_reports = []
+    jobs = []
+    # Clamping to the drawing bounds can map nearby centers onto the same
+    # bbox; render each distinct bbox only once and share the image.
+    unique_renders: Dict[Tuple[float, float, float, float], Tuple[Dict[str, float], Path]] = {}
     for i, (cx, cy, count) in enumerate(centers, 1):
         bbox = make_zoom_bbox(cx, cy, bounds, zoom_scale=zoom_scale)
-        image_path = output_dir / f"text_hotspot_{Path(file_path).stem}_{timestamp}_{i}.png"
-        render = render_drawing_region(
+        bbox_key = (bbox["x"], bbox["y"], bbox["width"], bbox["height"])
+        if bbox_key not in unique_renders:
+            image_path = output_dir / f"text_hotspot_{stem}_{timestamp}_{i}.png"
+            unique_renders[bbox_key] = (bbox, image_path)
+        jobs.append((i, cx, cy, count, bbox, bbox_key))
+
+    render_kwargs = {
+        bbox_key: dict(
             file_path=file_path,
             bbox=bbox,
-            output_size=(output_size, output_size),
+            output_size=size_tuple,
             output_path=str(image_path),
             color_mode="by_layer",
         )
+        for bbox_key, (bbox, image_path) in unique_renders.items()
+    }
+
+    # Only the long-lived --serve pool renders in parallel: its workers keep
+    # their parsed drawing between requests. A one-off pool would re-parse the
+    # DXF in every spawned worker; in-process, all regions share one parse
+    # (usually the one load_text_points already made).
+    if executor is not None:
+        futures = {
+            bbox_key: executor.submit(render_drawing_region, **kwargs)
+            for bbox_key, kwargs in render_kwargs.items()
+        }
+        renders = {bbox_key: future.result() for bbox_key, future in futures.items()}
+    else:
+        renders = {
+            bbox_key: render_drawing_region(**kwargs)
+            for bbox_key, kwargs in render_kwargs.items()
+        }
+
+    hotspot_reports = []
+    for i, cx, cy, count, bbox, bbox_key in jobs:
+        render = renders[bbox_key]
         if not render.get("success"):
             hotspot_reports.append(
                 {
@@ -231,7 +483,7 @@ def render_hotspots(
                 "text_count_estimate": count,
                 "image_path": render.get("image_path"),
                 "output_size": render.get("output_size"),
-                "sample_texts": sample_texts_in_bbox(text_points, bbox, limit=10),
+                "sample_texts": sample_texts_in_bbox(text_points, bbox, limit=10, index=text_index),
             }
         )
 
@@ -250,60 +502,116 @@ def render_hotspots(
 
 
 def write_markdown(report: Dict, md_path: Path):
-    lines: List[str] = []
-    lines.append("# Text Hotspot Zoom Report")
-    lines.append("")
-    lines.append(f"- DXF: `{report['file_path']}`")
-    lines.append(f"- Total decoded text points: `{report['text_points_count']}`")
-    lines.append(f"- Output size: `{report['parameters']['output_size']}`")
-    lines.append(f"- Max regions: `{report['parameters']['max_regions']}`")
-    lines.append(f"- Zoom scale: `{report['parameters']['zoom_scale']}`")
-    lines.append("")
-
-    lines.append("## Hotspots")
-    lines.append("")
-
-    for item in report["hotspots"]:
-        lines.append(f"### Region {item['index']}")
-        lines.append("")
-        if not item.get("success"):
-            lines.append(f"- Status: FAIL")
-            lines.append(f"- Error: `{item.get('error', 'unknown')}`")
-            lines.append(f"- BBox: `{item.get('bbox')}`")
-            lines.append("")
-            continue
-
-        lines.append("- Status: OK")
-        lines.append(f"- BBox: `{item['bbox']}`")
-        lines.append(f"- Center: `{item['center']}`")
-        lines.append(f"- Estimated text count in grid: `{item['text_count_estimate']}`")
-        lines.append(f"- Rendered size: `{item['output_size']}`")
-        lines.append(f"- Image: `{item['image_path']}`")
-        lines.append("")
-
-        image_path = Path(item["image_path"])
-        rel_str = os.path.relpath(image_path, md_path.parent).replace("\\", "/")
-        lines.append(f"![Region {item['index']}]({rel_str})")
-        lines.append("")
-
-        sample_texts = item.get("sample_texts", [])
-        if sample_texts:
-            lines.append("Sample texts:")
-            for text in sample_texts:
-                lines.append(f"- `{text}`")
-            lines.append("")
+    with md_path.open("w", encoding="utf-8") as f:
+        w = f.write
+        w("# Text Hotspot Zoom Report\n\n")
+        w(f"- DXF: `{report['file_path']}`\n")
+        w(f"- Total decoded text points: `{report['text_points_count']}`\n")
+        w(f"- Output size: `{report['parameters']['output_size']}`\n")
+        w(f"- Max regions: `{report['parameters']['max_regions']}`\n")
+        w(f"- Zoom scale: `{report['parameters']['zoom_scale']}`\n\n")
+
+        w("## Hotspots\n\n")
+
+        for item in report["hotspots"]:
+            w(f"### Region {item['index']}\n\n")
+            if not item.get("success"):
+                w("- Status: FAIL\n")
+                w(f"- Error: `{item.get('error', 'unknown')}`\n")
+                w(f"- BBox: `{item.get('bbox')}`\n\n")
+                continue
+
+            w("- Status: OK\n")
+            w(f"- BBox: `{item['bbox']}`\n")
+            w(f"- Center: `{item['center']}`\n")
+            w(f"- Estimated text count in grid: `{item['text_count_estimate']}`\n")
+            w(f"- Rendered size: `{item['output_size']}`\n")
+            w(f"- Image: `{item['image_path']}`\n\n")
+
+            image_path = Path(item["image_path"])
+            rel_str = os.path.relpath(image_path, md_path.parent).replace("\\", "/")
+            w(f"![Region {item['index']}]({rel_str})\n\n")
+
+            sample_texts = item.get("sample_texts", [])
+            if sample_texts:
+                w("Sample texts:\n")
+                for text in sample_texts:
+                    w(f"- `{text}`\n")
+                w("\n")
+
+
+def write_report(report: Dict) -> Tuple[Path, Path]:
+    out_dir = Path("workspace/rendered/diagnostics")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    stem = Path(report["file_path"]).stem
+    json_path = out_dir / f"text_hotspot_report_{stem}_{timestamp}.json"
+    md_path = out_dir / f"text_hotspot_report_{stem}_{timestamp}.md"
 
-    md_path.write_text("\n".join(lines), encoding="utf-8")
+    json_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    write_markdown(report, md_path)
+    return json_path, md_path
+
+
+@lru_cache(maxsize=8)
+def _load_text_points_cached(file_path: str, mtime_ns: int, size: int) -> Dict:
+    # mtime/size are part of the key so an edited DXF is reloaded.
+    return load_text_points(file_path)
+
+
+def serve(defaults: argparse.Namespace) -> int:
+    """
+    Answer JSONL requests on stdin, one report per line on stdout:
+    {"file": ..., "size": ..., "regions": ..., "zoom_scale": ...}
+    Parsed drawings and the render pool stay alive between requests, so
+    parameter sweeps only pay for the DXF parse once.
+    """
+    with ProcessPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            try:
+                req = json.loads(line)
+                file_path = req["file"]
+                stat = os.stat(file_path)
+                report = render_hotspots(
+                    file_path=file_path,
+                    output_size=int(req.get("size", defaults.size)),
+                    max_regions=int(req.get("regions", defaults.regions)),
+                    zoom_scale=float(req.get("zoom_scale", defaults.zoom_scale)),
+                    loaded=_load_text_points_cached(file_path, stat.st_mtime_ns, stat.st_size),
+                    executor=executor,
+                )
+            except Exception as e:
+                report = {"success": False, "error": f"{type(e).__name__}: {e}"}
+
+            if report.get("success"):
+                json_path, md_path = write_report(report)
+                reply = {"json": str(json_path), "md": str(md_path)}
+            else:
+                reply = report
+            print(json.dumps(reply, ensure_ascii=False), flush=True)
+    return 0
 
 
 def main():
     parser = argparse.ArgumentParser(description="Render text hotspots and generate markdown report")
-    parser.add_argument("--file", required=True, help="DXF file path")
+    parser.add_argument("--file", help="DXF file path")
     parser.add_argument("--size", type=int, default=2400, help="max side length for each hotspot image")
     parser.add_argument("--regions", type=int, default=4, help="number of hotspot regions")
     parser.add_argument("--zoom-scale", type=float, default=0.16, help="zoom bbox size as ratio of full bounds")
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="read JSONL requests from stdin; --size/--regions/--zoom-scale become defaults",
+    )
     args = parser.parse_args()
 
+    if args.serve:
+        return serve(args)
+    if not args.file:
+        parser.error("--file is required unless --serve is given")
+
     report = render_hotspots(
         file_path=args.file,
         output_size=args.size,
@@ -314,15 +622,7 @@ def main():
         print(json.dumps(report, ensure_ascii=False, indent=2))
         return 1
 
-    out_dir = Path("workspace/rendered/diagnostics")
-    out_dir.mkdir(parents=True, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    stem = Path(args.file).stem
-    json_path = out_dir / f"text_hotspot_report_{stem}_{timestamp}.json"
-    md_path = out_dir / f"text_hotspot_report_{stem}_{timestamp}.md"
-
-    json_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
-    write_markdown(report, md_path)
+    json_path, md_path = write_report(report)
 
     print(f"JSON: {json_path}")
     print(f"Markdown: {md_path}")
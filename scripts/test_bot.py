@@ -5,7 +5,9 @@
 测试完成后生成详细的测试报告。
 """
 import asyncio
+import json
 import sys
+import traceback
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Any
@@ -21,24 +23,45 @@ os.environ.pop('HTTPS_PROXY', None)
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+import httpx
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
-from src.infrastructure.database.session import get_db
+from src.infrastructure.database.session import get_db_session
 from src.core.agent.memory_driven_agent import MemoryDrivenAgent
+from src.infrastructure.utils.event_loop import run
 from src.skills.initialize import initialize_all_tools
 
 load_dotenv()
 
+# 工具注册只需一次，进程内所有 Agent 共享
+initialize_all_tools()
+
+# 测试机器人共用一个客户端，generate_question / analyze_conversation 复用 keep-alive 连接
+_deepseek_client = AsyncOpenAI(
+    api_key=os.getenv("DEEPSEEK_API_KEY"),
+    base_url=os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com"),
+    http_client=httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=8),
+        timeout=httpx.Timeout(300.0, connect=10.0),
+    ),
+)
+
+
+# 逐轮评分的维度；工作流程完整性针对整段对话，单独评分
+TURN_SCORE_KEYS = (
+    "tool_usage_score",
+    "logging_score",
+    "professionalism_score",
+    "problem_detection_score",
+)
+
 
 class TestBot:
     """测试机器人 - 使用 DeepSeek 模拟用户"""
 
     def __init__(self):
-        self.client = AsyncOpenAI(
-            api_key=os.getenv("DEEPSEEK_API_KEY"),
-            base_url=os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
-        )
+        self.client = _deepseek_client
         self.conversation_history = []
 
     async def generate_question(
@@ -93,17 +116,59 @@ class TestBot:
         question = response.choices[0].message.content.strip()
         return question
 
-    async def analyze_conversation(
-        self,
-        conversation: List[Dict[str, Any]]
-    ) -> Dict[str, Any]:
+    async def _score_turn(self, round_num: int, turn: Dict[str, Any]) -> Dict[str, Any]:
         """
-        分析整个对话过程，生成测试报告
+        对单轮对话评分
+
+        Args:
+            round_num: 轮次
+            turn: 单轮对话记录
+        """
+        prompt = f"""你是一个测试分析师，请分析监理 AI 助手测试对话中的一轮。
+
+[轮次 {round_num}]
+用户: {turn['question']}
+助手: {turn['response'][:300]}...
+工具调用: {turn['tool_calls']}
+
+请从以下维度分析：
+1. 工具使用合理性 - 工具调用是否恰当
+2. 日志记录情况 - 是否记录了工作日志（查看 append_to_file 调用）
+3. 专业性 - 回答是否专业、严谨
+4. 问题发现能力 - 是否发现了图纸问题
+
+输出 JSON 格式：
+{{
+  "tool_usage_score": 0-10,
+  "logging_score": 0-10,
+  "professionalism_score": 0-10,
+  "problem_detection_score": 0-10,
+  "summary": "本轮评价",
+  "strengths": ["优点1", "优点2"],
+  "weaknesses": ["不足1", "不足2"]
+}}"""
+
+        response = await self.client.chat.completions.create(
+            model="deepseek-chat",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            # JSON 模式：避免回复被包进 markdown 代码块导致解析失败
+            response_format={"type": "json_object"}
+        )
+
+        content = response.choices[0].message.content
+        try:
+            return json.loads(content)
+        except (TypeError, json.JSONDecodeError):
+            return {"error": "分析失败", "raw": content}
+
+    async def _score_workflow(self, conversation: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        对整段对话的工作流程完整性评分（需看到全部轮次，不能由单轮分数平均得到）
 
         Args:
             conversation: 对话历史
         """
-        # 构建对话摘要
         dialogue = "\n\n".join([
             f"[轮次 {i+1}]\n用户: {turn['question']}\n助手: {turn['response'][:300]}...\n工具调用: {turn['tool_calls']}"
             for i, turn in enumerate(conversation)
@@ -114,37 +179,61 @@ class TestBot:
 对话记录：
 {dialogue}
 
-请从以下维度分析：
-1. 工作流程完整性 - 是否按照监理工作流程进行
-2. 工具使用合理性 - 工具调用是否恰当
-3. 日志记录情况 - 是否记录了工作日志（查看 append_to_file 调用）
-4. 专业性 - 回答是否专业、严谨
-5. 问题发现能力 - 是否发现了图纸问题
+请评价工作流程完整性：整段对话是否按照监理工作流程进行。
 
 输出 JSON 格式：
 {{
-  "workflow_score": 0-10,
-  "tool_usage_score": 0-10,
-  "logging_score": 0-10,
-  "professionalism_score": 0-10,
-  "problem_detection_score": 0-10,
-  "summary": "总体评价",
-  "strengths": ["优点1", "优点2"],
-  "weaknesses": ["不足1", "不足2"]
+  "workflow_score": 0-10
 }}"""
 
         response = await self.client.chat.completions.create(
             model="deepseek-chat",
             messages=[{"role": "user", "content": prompt}],
-            temperature=0.3
+            temperature=0.3,
+            response_format={"type": "json_object"}
         )
 
-        import json
+        content = response.choices[0].message.content
         try:
-            analysis = json.loads(response.choices[0].message.content)
-        except:
-            analysis = {"error": "分析失败", "raw": response.choices[0].message.content}
+            return json.loads(content)
+        except (TypeError, json.JSONDecodeError):
+            return {"error": "分析失败", "raw": content}
+
+    async def analyze_conversation(
+        self,
+        conversation: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        分析整个对话过程，生成测试报告
+
+        整段对话的工作流程评分与逐轮评分并发请求，再汇总为整体结果（逐轮维度取各轮平均）。
 
+        Args:
+            conversation: 对话历史
+        """
+        workflow_result, *turn_results = await asyncio.gather(
+            self._score_workflow(conversation),
+            *[self._score_turn(i + 1, turn) for i, turn in enumerate(conversation)]
+        )
+        scored = [r for r in turn_results if "error" not in r]
+        if not scored:
+            return {"error": "分析失败", "raw": [r.get("raw") for r in turn_results]}
+
+        analysis: Dict[str, Any] = {}
+        workflow_score = workflow_result.get("workflow_score")
+        analysis["workflow_score"] = workflow_score if isinstance(workflow_score, (int, float)) else "N/A"
+        for key in TURN_SCORE_KEYS:
+            values = [r[key] for r in scored if isinstance(r.get(key), (int, float))]
+            analysis[key] = round(sum(values) / len(values), 1) if values else "N/A"
+
+        analysis["summary"] = "\n".join(
+            f"[轮次 {round_num}] {r.get('summary', '')}"
+            for round_num, r in enumerate(turn_results, start=1)
+            if "error" not in r
+        )
+        # 各轮的优点/不足合并去重，保持出现顺序
+        analysis["strengths"] = list(dict.fromkeys(s for r in scored for s in r.get("strengths", [])))
+        analysis["weaknesses"] = list(dict.fromkeys(w for r in scored for w in r.get("weaknesses", [])))
         return analysis
 
 
@@ -179,85 +268,95 @@ async def run_supervision_test():
     test_bot = TestBot()
     conversation_history = []
 
-    # 初始化 Supervision Agent
-    print("初始化 Supervision Agent...")
-    async for db in get_db():
-        agent = MemoryDrivenAgent(
-            db=db,
-            use_reasoner=False,
-            fixed_skill_id="supervision"
-        )
-
-        print(f"✓ Agent 初始化完成")
-        print(f"  - Skill: supervision")
-        print(f"  - 模型将在首次调用时初始化")
-        print()
-
-        # 进行多轮对话测试
-        max_rounds = 5  # 增加到5轮
-        for round_num in range(1, max_rounds + 1):
-            print("-" * 80)
-            print(f"第 {round_num} 轮对话")
-            print("-" * 80)
-
-            # 生成测试问题
-            previous_response = conversation_history[-1]["response"] if conversation_history else None
-            question = await test_bot.generate_question(
-                context=test_scenario,
-                previous_response=previous_response,
-                round_num=round_num
+    # 第一轮问题不依赖助手回答，与 Agent 初始化并行生成
+    first_question = asyncio.create_task(
+        test_bot.generate_question(context=test_scenario, round_num=1)
+    )
+
+    try:
+        # 初始化 Supervision Agent
+        print("初始化 Supervision Agent...")
+        async with get_db_session() as db:
+            agent = MemoryDrivenAgent(
+                db=db,
+                use_reasoner=False,
+                fixed_skill_id="supervision"
             )
 
-            print(f"\n[测试机器人] {question}\n")
-
-            # Supervision Agent 处理
-            print("[Supervision Agent 工作中...]\n")
-
-            try:
-                result = await agent.process_message(
-                    user_message=question,
-                    session_id=None
-                )
-
-                response_text = result.get("text", "")
-                tool_calls = result.get("metadata", {}).get("tool_calls", [])
-
-                # 第一轮后打印模型信息
-                if round_num == 1 and agent.llm_client:
-                    print(f"✓ 模型已初始化: {agent.llm_client.model}")
-                    print(f"  Provider: {agent.llm_client.provider}")
-                    print(f"  Vision: {agent.llm_client.supports_vision}\n")
-
-                print(f"[Supervision Agent] {response_text[:500]}...")
-                print(f"\n工具调用: {len(tool_calls)} 次")
-                if tool_calls:
-                    for tc in tool_calls[:3]:
-                        print(f"  - {tc['name']}")
-
-                # 记录对话
-                conversation_history.append({
-                    "round": round_num,
-                    "question": question,
-                    "response": response_text,
-                    "tool_calls": [tc["name"] for tc in tool_calls]
-                })
-
-            except Exception as e:
-                error_msg = str(e)
-                print(f"\n❌ 错误: {error_msg}")
-
-                # 如果是网络超时，记录但继续
-                if "CancelledError" in error_msg or "timeout" in error_msg.lower():
-                    print("  (网络超时，跳过本轮)")
-                    continue
-                else:
-                    import traceback
-                    traceback.print_exc()
-                    break
-
+            print(f"✓ Agent 初始化完成")
+            print(f"  - Skill: supervision")
+            print(f"  - 模型将在首次调用时初始化")
             print()
 
-        break  # 退出 db session
+            # 进行多轮对话测试
+            max_rounds = 5  # 增加到5轮
+            for round_num in range(1, max_rounds + 1):
+                print("-" * 80)
+                print(f"第 {round_num} 轮对话")
+                print("-" * 80)
+
+                # 生成测试问题
+                if round_num == 1:
+                    question = await first_question
+                else:
+                    previous_response = conversation_history[-1]["response"] if conversation_history else None
+                    question = await test_bot.generate_question(
+                        context=test_scenario,
+                        previous_response=previous_response,
+                        round_num=round_num
+                    )
+
+                print(f"\n[测试机器人] {question}\n")
+
+                # Supervision Agent 处理
+                print("[Supervision Agent 工作中...]\n")
+
+                try:
+                    result = await agent.process_message(
+                        user_message=question,
+                        session_id=None
+                    )
+
+                    response_text = result.get("text", "")
+                    tool_calls = result.get("metadata", {}).get("tool_calls", [])
+
+                    # 第一轮后打印模型信息
+                    if round_num == 1 and agent.llm_client:
+                        print(f"✓ 模型已初始化: {agent.llm_client.model}")
+                        print(f"  Provider: {agent.llm_client.provider}")
+                        print(f"  Vision: {agent.llm_client.supports_vision}\n")
+
+                    print(f"[Supervision Agent] {response_text[:500]}...")
+                    print(f"\n工具调用: {len(tool_calls)} 次")
+                    if tool_calls:
+                        for tc in tool_calls[:3]:
+                            print(f"  - {tc['name']}")
+
+                    # 记录对话
+                    conversation_history.append({
+                        "round": round_num,
+                        "question": question,
+                        "response": response_text,
+                        "tool_calls": [tc["name"] for tc in tool_calls]
+                    })
+
+                except Exception as e:
+                    error_msg = str(e)
+                    print(f"\n❌ 错误: {error_msg}")
+
+                    # 如果是网络超时，记录但继续
+                    if "CancelledError" in error_msg or "timeout" in error_msg.lower():
+                        print("  (网络超时，跳过本轮)")
+                        continue
+                    else:
+                        traceback.print_exc()
+                        break
+
+                print()
+    finally:
+        # Agent 初始化失败时第一轮问题从未被 await：取消并取回结果，不留下孤立请求
+        first_question.cancel()
+        await asyncio.gather(first_question, return_exceptions=True)
 
     # 分析对话质量
     print("=" * 80)
@@ -350,4 +449,4 @@ async def run_supervision_test():
 
 
 if __name__ == "__main__":
-    asyncio.run(run_supervision_test())
+    run(run_supervision_test())
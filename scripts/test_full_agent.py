@@ -3,6 +3,7 @@
 """
 import asyncio
 import sys
+import traceback
 from pathlib import Path
 
 project_root = Path(__file__).parent.parent
@@ -41,7 +42,6 @@ async def test_agent():
             print(f"✓ 第 1 次成功: {result.get('text', '')[:50]}...\n")
         except Exception as e:
             print(f"❌ 第 1 次失败: {e}\n")
-            import traceback
             traceback.print_exc()
             break
 
@@ -55,7 +55,6 @@ async def test_agent():
             print(f"✓ 第 2 次成功: {result.get('text', '')[:50]}...\n")
         except Exception as e:
             print(f"❌ 第 2 次失败: {e}\n")
-            import traceback
             traceback.print_exc()
 
         break
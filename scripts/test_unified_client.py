@@ -10,6 +10,15 @@ sys.path.insert(0, str(project_root))
 
 from src.infrastructure.llm.unified_client import UnifiedLLMClient
 
+# 两次调用共用同一份工具定义
+TEST_TOOLS = [{
+    "type": "function",
+    "function": {
+        "name": "test",
+        "description": "测试",
+        "parameters": {"type": "object", "properties": {}}
+    }
+}]
 
 async def test_unified_client():
     """测试 UnifiedLLMClient"""
@@ -29,14 +38,7 @@ async def test_unified_client():
     print("第 1 次调用...")
     response = await client.chat_completion(
         messages=[{"role": "user", "content": "你好"}],
-        tools=[{
-            "type": "function",
-            "function": {
-                "name": "test",
-                "description": "测试",
-                "parameters": {"type": "object", "properties": {}}
-            }
-        }]
+        tools=TEST_TOOLS
     )
     print(f"✓ 第 1 次成功: {response.choices[0].message.content[:50]}...")
     print()
@@ -45,14 +47,7 @@ async def test_unified_client():
     print("第 2 次调用...")
     response = await client.chat_completion(
         messages=[{"role": "user", "content": "再见"}],
-        tools=[{
-            "type": "function",
-            "function": {
-                "name": "test",
-                "description": "测试",
-                "parameters": {"type": "object", "properties": {}}
-            }
-        }]
+        tools=TEST_TOOLS
     )
     print(f"✓ 第 2 次成功: {response.choices[0].message.content[:50]}...")
 
@@ -7,7 +7,7 @@
 3. 动态工具挂载
 4. 对话压缩
 """
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set
 from uuid import UUID
 import json
 import asyncio
@@ -20,6 +20,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.core.agent.state import AgentState, get_session_manager
 from src.infrastructure.llm.deepseek_client import DeepSeekClient
 from src.infrastructure.llm.unified_client import create_llm_client
+from src.infrastructure.utils import json_codec
 from src.core.memory.embedding_service import EmbeddingService
 from src.core.memory.online_memory_adapter import OnlineMemoryAdapter
 from src.core.skills.skill_service import SkillService
@@ -50,6 +51,9 @@ class MemoryDrivenAgent:
         self.max_tool_calls_per_turn = 14
         # Soft loop advisory: same tool+args repeated this many times will trigger a warning hint.
         self.loop_review_repeat_threshold = 3
+        # Replay only the most recent user turns verbatim; older turns are folded into one system note.
+        self.max_history_turns = 6
+        self.history_summary_chars = 80
         # Auto trace worklog path for detailed per-iteration execution record.
         self.trace_log_path = Path("workspace/work_log_detailed.md")
         self.fixed_skill_id = fixed_skill_id
@@ -62,6 +66,8 @@ class MemoryDrivenAgent:
 
         # 线上记忆适配器
         self.online_memory_adapter = OnlineMemoryAdapter(enabled=False)  # 临时禁用线上记忆
+        # 未完成的后台存储任务（持有引用防止被回收，关闭时等待其结束）
+        self._background_tasks: Set[asyncio.Task] = set()
 
         # 工具注册表
         self.tool_registry = get_tool_registry()
@@ -318,7 +324,9 @@ class MemoryDrivenAgent:
                     tracker.end_async_step("线上记忆存储", error=str(e))
 
             # 创建后台任务，不等待完成
-            asyncio.create_task(store_to_online_background())
+            task = asyncio.create_task(store_to_online_background())
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
 
             # 完成追踪（主流程）
             tracker.complete(response=result["text"])
@@ -349,6 +357,17 @@ class MemoryDrivenAgent:
                 "session_id": str(state.session_id)
             }
 
+    async def close(self):
+        """
+        释放 Agent 持有的资源
+
+        等待尚未完成的后台存储任务，然后关闭线上记忆适配器的共享 HTTP 会话。
+        应在事件循环结束前调用（如聊天退出时）。
+        """
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        await self.online_memory_adapter.close()
+
     def _build_messages(
         self,
         state: AgentState,
@@ -372,8 +391,24 @@ class MemoryDrivenAgent:
         # 构建消息列表
         messages = [{"role": "system", "content": system_prompt}]
 
-        # 添加对话历史
-        for msg in state.conversation_history:
+        # 添加对话历史：超出窗口的早期轮次折叠为一条摘要，保持每轮请求的上下文长度有界
+        history = state.conversation_history
+        user_indices = [index for index, msg in enumerate(history) if msg.role == "user"]
+        if len(user_indices) > self.max_history_turns:
+            # 从某条 user 消息处切分，assistant 的 tool_calls 与对应 tool 消息不会被拆开
+            cut = user_indices[-self.max_history_turns]
+            folded = [
+                f"{msg.role}: {msg.content[:self.history_summary_chars]}"
+                for msg in history[:cut]
+                if msg.role in ("user", "assistant") and msg.content
+            ]
+            messages.append({
+                "role": "system",
+                "content": f"更早的 {len(user_indices) - self.max_history_turns} 轮对话摘要：" + "; ".join(folded)
+            })
+            history = history[cut:]
+
+        for msg in history:
             message_dict = {
                 "role": msg.role,
                 "content": msg.content
@@ -501,7 +536,7 @@ class MemoryDrivenAgent:
             # 收集工具调用信息
             for tool_call, result, exec_info in zip(tool_calls, tool_results, tool_exec_infos):
                 try:
-                    parsed_args = json.loads(tool_call.function.arguments)
+                    parsed_args = json_codec.loads(tool_call.function.arguments)
                 except Exception:
                     parsed_args = {"_raw_arguments": tool_call.function.arguments}
                 signature = exec_info.get("signature")
@@ -569,20 +604,23 @@ class MemoryDrivenAgent:
 
             messages.append(assistant_message)
 
+            # 工具结果只序列化一次，同时用于请求消息和会话状态
+            tool_contents = [json_codec.dumps(result) for result in tool_results]
+
             # 添加工具结果消息
-            for tool_call, result in zip(tool_calls, tool_results):
+            for tool_call, tool_content in zip(tool_calls, tool_contents):
                 messages.append({
                     "role": "tool",
                     "tool_call_id": tool_call.id,
-                    "content": json.dumps(result, ensure_ascii=False)
+                    "content": tool_content
                 })
 
             # 保存到会话状态
             state.add_message("assistant", content, tool_calls=tool_calls)
 
             # 保存 tool 结果消息
-            for tool_call, result in zip(tool_calls, tool_results):
-                state.add_message("tool", json.dumps(result, ensure_ascii=False), tool_call_id=tool_call.id)
+            for tool_call, tool_content in zip(tool_calls, tool_contents):
+                state.add_message("tool", tool_content, tool_call_id=tool_call.id)
 
             total_tool_calls += len(tool_calls)
             if total_tool_calls >= self.max_tool_calls_per_turn:
@@ -676,7 +714,7 @@ class MemoryDrivenAgent:
         for tool_call in tool_calls:
             function_name = tool_call.function.name
             try:
-                arguments = json.loads(tool_call.function.arguments)
+                arguments = json_codec.loads(tool_call.function.arguments)
             except Exception:
                 results.append({
                     "success": False,
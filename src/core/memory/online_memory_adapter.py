@@ -40,9 +40,27 @@ class OnlineMemoryAdapter:
         # 确保 base_url 不以 / 结尾
         self.base_url = self.base_url.rstrip("/")
 
+        # 共享的 HTTP 会话（延迟创建，复用连接池和 DNS 缓存）
+        self._session: Optional[aiohttp.ClientSession] = None
+
         if self.enabled:
             debug_print(f"✅ 线上记忆适配器已启用 (URL: {self.base_url})")
 
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取共享的 HTTP 会话，首次调用或已关闭时创建"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=30, sock_connect=3)
+            )
+        return self._session
+
+    async def close(self):
+        """关闭共享的 HTTP 会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
     async def recall_memories(
         self,
         query: str,
@@ -95,19 +113,17 @@ class OnlineMemoryAdapter:
             if self.api_key:
                 headers["Authorization"] = f"Bearer {self.api_key}"
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url,
-                    json=request_body,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        print(f"⚠️ API 返回错误: {response.status} - {error_text}")
-                        return []
+            async with self._get_session().post(
+                url,
+                json=request_body,
+                headers=headers
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    print(f"⚠️ API 返回错误: {response.status} - {error_text}")
+                    return []
 
-                    data = await response.json()
+                data = await response.json()
 
             api_duration = time.time() - api_start
             debug_print(f"  ⏱️  API 调用耗时: {api_duration:.2f}s")
@@ -257,19 +273,17 @@ class OnlineMemoryAdapter:
             if self.api_key:
                 headers["Authorization"] = f"Bearer {self.api_key}"
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url,
-                    json=request_body,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        print(f"⚠️ 存储消息失败: {response.status} - {error_text}")
-                        return None
-
-                    data = await response.json()
+            async with self._get_session().post(
+                url,
+                json=request_body,
+                headers=headers
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    print(f"⚠️ 存储消息失败: {response.status} - {error_text}")
+                    return None
+
+                data = await response.json()
 
             debug_print(f"✅ 线上记忆存储消息: chunk_id={data.get('chunk_id')}, task_id={data.get('task_id')}")
             return data
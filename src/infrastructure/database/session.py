@@ -1,6 +1,7 @@
 """
 Database session management.
 """
+from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from src.infrastructure.database.connection import engine
@@ -36,6 +37,12 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+# Same commit/rollback semantics as get_db, usable from scripts:
+#     async with get_db_session() as db:
+#         # use db
+get_db_session = asynccontextmanager(get_db)
+
+
 def get_session():
     """
     Context manager for getting a database session.
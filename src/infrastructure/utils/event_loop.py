@@ -0,0 +1,38 @@
+"""
+事件循环工具 - 可用时使用 uvloop 运行顶层协程
+"""
+import asyncio
+import sys
+from typing import Any, Coroutine, TypeVar
+
+# uvloop 为可选依赖（不支持 Windows），未安装时回退到标准事件循环
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+
+T = TypeVar("T")
+
+
+def run(main: Coroutine[Any, Any, T]) -> T:
+    """
+    运行顶层协程，替代 asyncio.run
+
+    Args:
+        main: 入口协程
+
+    Returns:
+        协程返回值
+    """
+    if not UVLOOP_AVAILABLE:
+        return asyncio.run(main)
+
+    # asyncio.Runner 的 loop_factory 需要 Python 3.11+；更早版本改为安装 uvloop 事件循环策略
+    if sys.version_info < (3, 11):
+        uvloop.install()
+        return asyncio.run(main)
+
+    with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+        return runner.run(main)
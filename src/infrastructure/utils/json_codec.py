@@ -0,0 +1,49 @@
+"""
+JSON 编解码工具 - 可用时使用 orjson 序列化工具结果等大负载
+"""
+import json
+from typing import Any
+
+# orjson 为可选依赖，未安装时回退到标准库 json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def dumps(obj: Any) -> str:
+    """
+    序列化为紧凑 JSON 字符串（不转义非 ASCII、无多余空格）
+
+    与 json.dumps 的差异：NaN / Infinity 输出为 null（orjson 行为）；
+    orjson 不支持的对象回退到标准库时，NaN / Infinity 仍按标准库输出。
+
+    Args:
+        obj: 待序列化对象
+
+    Returns:
+        JSON 字符串
+    """
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            # orjson 不支持的类型（如超 64 位整数）交给标准库，保持原有报错行为
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(data: str) -> Any:
+    """
+    解析 JSON 字符串；解析失败抛出 json.JSONDecodeError（orjson 的异常为其子类）
+
+    Args:
+        data: JSON 字符串
+
+    Returns:
+        解析结果
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -10,14 +10,21 @@ CAD Agent Runner - CAD 图纸分析 Agent
 
 import os
 import json
-from typing import Dict, Any, List, Optional
-from openai import OpenAI
+import asyncio
+import copy
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional, Tuple
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
 # 加载环境变量
 load_dotenv()
 
 # 导入工具函数
+from infrastructure.utils import json_codec
 from services.cad_agent_tools import (
     get_cad_metadata,
     inspect_region,
@@ -30,14 +37,41 @@ from services.cad_agent_tools import (
     CAD_AGENT_TOOLS,
 )
 
-# 初始化 Kimi 客户端
-client = OpenAI(
-    api_key=os.getenv("VISION_MODEL_API_KEY"),
-    base_url=os.getenv("VISION_MODEL_BASE_URL")
-)
-
 MODEL_NAME = os.getenv("VISION_MODEL_NAME", "kimi-k2.5")
 
+# 工具定义是静态的：经 extra_body 原样并入请求体，跳过 SDK 每次请求对 tools 参数的类型转换遍历
+_TOOLS_EXTRA_BODY = {"tools": CAD_AGENT_TOOLS}
+
+# 同一进程内多个 Agent 会话共享，限制同时在途的 LLM 请求数
+LLM_MAX_CONCURRENCY = 4
+# asyncio.Semaphore 绑定首次等待它的事件循环，按循环分别创建
+_llm_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+# 只有最近几轮的区域截图随请求重发，更早的替换为文本占位，避免每轮请求体持续膨胀
+IMAGE_HISTORY_TURNS = 2
+
+
+def _create_llm_client() -> AsyncOpenAI:
+    """
+    创建 Kimi 客户端（SDK 内置指数退避重试：连接错误、429、5xx）
+
+    客户端的连接池绑定当前事件循环，每次 run_cad_agent 调用各自创建并关闭。
+    """
+    return AsyncOpenAI(
+        api_key=os.getenv("VISION_MODEL_API_KEY"),
+        base_url=os.getenv("VISION_MODEL_BASE_URL"),
+        max_retries=5,
+    )
+
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    """获取当前事件循环上的 LLM 并发信号量（同一循环内的 Agent 会话共享）"""
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _llm_semaphores[loop] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return semaphore
+
 
 # ============================================================
 # 工具调用处理
@@ -84,11 +118,244 @@ def execute_tool_call(tool_name: str, arguments: Dict[str, Any]) -> Dict[str, An
             "error": f"工具执行失败: {str(e)}"
         }
 
+
+def execute_tool_call_batch(calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """在同一个 worker 中依次执行多个工具调用（共享该进程的 DXF 文档与空间索引缓存）"""
+    return [execute_tool_call(tool_name, arguments) for tool_name, arguments in calls]
+
+# 只读工具之间互不依赖，可并行执行；写文件 / 格式转换必须保持模型给出的顺序
+PARALLEL_SAFE_TOOLS = frozenset({
+    "get_cad_metadata",
+    "inspect_region",
+    "extract_cad_entities",
+    "list_files",
+    "read_file",
+})
+
+# 纯文件读写工具在本进程的线程中执行：追加缓冲只存在于单个进程内，
+# 读写必须落在同一进程才能看到尚未落盘的追加内容
+FILE_TOOLS = frozenset({
+    "list_files",
+    "read_file",
+    "write_file",
+    "append_to_file",
+})
+
+# 结果只取决于参数和 DXF 内容的 CAD 工具：文件未变时相同调用直接复用上次结果
+CACHEABLE_TOOLS = frozenset({
+    "get_cad_metadata",
+    "inspect_region",
+    "extract_cad_entities",
+})
+TOOL_RESULT_CACHE_SIZE = 64
+
+_tool_executor: Optional[ProcessPoolExecutor] = None
+# 缓存键 -> (工具结果, 结果引用的图片及其 (mtime_ns, 大小))
+_tool_result_cache: "OrderedDict[Tuple[Any, ...], Tuple[Dict[str, Any], Tuple[Any, ...]]]" = OrderedDict()
+
+
+def _get_tool_executor() -> ProcessPoolExecutor:
+    """
+    懒加载工具进程池
+
+    渲染依赖 pyplot 全局状态、ezdxf 降噪会重定向 stdout，都不是线程安全的，
+    因此用进程而非线程并行；进程池跨轮次复用，worker 内的 DXF 缓存保持有效。
+    """
+    global _tool_executor
+    if _tool_executor is None:
+        _tool_executor = ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+    return _tool_executor
+
+
+def _reset_tool_executor(broken: ProcessPoolExecutor) -> None:
+    """丢弃已损坏的工具进程池（已被重建时不动新的进程池）"""
+    global _tool_executor
+    broken.shutdown(wait=False, cancel_futures=True)
+    if _tool_executor is broken:
+        _tool_executor = None
+
+
+def _file_stamp(path: Any) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _tool_cache_key(tool_name: str, arguments: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+    """按 工具名 + 规范化参数 + DXF 文件 (mtime, 大小) 生成缓存键；不可缓存时返回 None"""
+    if tool_name not in CACHEABLE_TOOLS:
+        return None
+    file_path = arguments.get("file_path")
+    stamp = _file_stamp(file_path)
+    if stamp is None:
+        return None
+    try:
+        canonical_arguments = json.dumps(arguments, ensure_ascii=False, sort_keys=True)
+    except (TypeError, ValueError):
+        return None
+    return (tool_name, canonical_arguments, os.path.abspath(file_path), stamp)
+
+
+def _output_image_stamps(result: Dict[str, Any]) -> Tuple[Any, ...]:
+    data = result.get("data") or {}
+    return tuple(
+        (path, _file_stamp(path))
+        for path in (data.get("image_path"), data.get("thumbnail"))
+        if path
+    )
+
+
+def _get_cached_tool_result(key: Tuple[Any, ...]) -> Optional[Dict[str, Any]]:
+    entry = _tool_result_cache.get(key)
+    if entry is None:
+        return None
+    result, image_stamps = entry
+    # 渲染图可能已被同名区域的其他渲染覆盖，此时结果不再可信
+    if any(_file_stamp(path) != stamp for path, stamp in image_stamps):
+        del _tool_result_cache[key]
+        return None
+    _tool_result_cache.move_to_end(key)
+    return copy.deepcopy(result)
+
+
+def _put_cached_tool_result(key: Tuple[Any, ...], result: Dict[str, Any]) -> None:
+    if not result.get("success"):
+        return
+    _tool_result_cache[key] = (copy.deepcopy(result), _output_image_stamps(result))
+    _tool_result_cache.move_to_end(key)
+    while len(_tool_result_cache) > TOOL_RESULT_CACHE_SIZE:
+        _tool_result_cache.popitem(last=False)
+
+
+async def execute_tool_calls(calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    执行一轮中的全部工具调用，结果与 calls 顺序一致
+
+    CAD 工具在进程池中运行，文件工具在本进程线程中运行，都不阻塞事件循环；
+    连续的只读工具并行执行，其他工具作为屏障，按原顺序单独执行。
+    可缓存的 CAD 工具命中缓存时不再执行，同一批内的重复调用只执行一次。
+    """
+    loop = asyncio.get_running_loop()
+    results: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+    batch: List[int] = []
+
+    async def run_task(task_calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        if all(tool_name in FILE_TOOLS for tool_name, _ in task_calls):
+            return await asyncio.to_thread(execute_tool_call_batch, task_calls)
+        executor = _get_tool_executor()
+        try:
+            return await loop.run_in_executor(executor, execute_tool_call_batch, task_calls)
+        except BrokenProcessPool as e:
+            # worker 异常退出（如渲染大图时内存不足）：丢弃损坏的进程池，下次调用重建
+            _reset_tool_executor(executor)
+            return [
+                {"success": False, "error": f"工具执行失败: 工作进程异常退出 ({e})"}
+                for _ in task_calls
+            ]
+
+    async def flush_batch():
+        # 相同缓存键的调用共用一次执行
+        pending: Dict[Any, List[int]] = {}
+        for index in batch:
+            key = _tool_cache_key(*calls[index])
+            pending.setdefault(key if key is not None else index, []).append(index)
+
+        # 同一图纸上的 CAD 工具合并为一个 worker 任务：图纸只解析一次、空间索引只建一次，
+        # 不同图纸及其他工具仍并行
+        tasks: Dict[Any, List[Any]] = {}
+        for group, indices in pending.items():
+            tool_name, arguments = calls[indices[0]]
+            file_path = arguments.get("file_path")
+            if tool_name in CACHEABLE_TOOLS and isinstance(file_path, str):
+                task_key = ("file", os.path.abspath(file_path))
+            else:
+                task_key = ("call", group)
+            tasks.setdefault(task_key, []).append(group)
+
+        task_results = await asyncio.gather(*[
+            run_task([calls[pending[group][0]] for group in groups])
+            for groups in tasks.values()
+        ])
+        for groups, group_results in zip(tasks.values(), task_results):
+            for group, result in zip(groups, group_results):
+                if isinstance(group, tuple):
+                    _put_cached_tool_result(group, result)
+                indices = pending[group]
+                results[indices[0]] = result
+                for index in indices[1:]:
+                    results[index] = copy.deepcopy(result)
+        batch.clear()
+
+    for index, (tool_name, arguments) in enumerate(calls):
+        key = _tool_cache_key(tool_name, arguments)
+        cached = _get_cached_tool_result(key) if key is not None else None
+        if cached is not None:
+            print(f"♻️ 复用缓存结果: {tool_name}")
+            results[index] = cached
+        elif tool_name in PARALLEL_SAFE_TOOLS:
+            batch.append(index)
+        else:
+            await flush_batch()
+            results[index] = (await run_task([(tool_name, arguments)]))[0]
+    await flush_batch()
+
+    return results
+
+
+def _build_image_message(images: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """
+    把一轮中 inspect_region 的预览图组装为一条多模态 user 消息
+
+    图片以 image_url 内容块发送，由视觉编码器直接处理，不再作为 JSON 字符串塞进 tool 消息。
+
+    Args:
+        images: (图片路径, JPEG 预览的 base64) 列表，按工具调用顺序
+
+    Returns:
+        user 消息
+    """
+    content: List[Dict[str, Any]] = [
+        {"type": "text", "text": "以上 inspect_region 调用的区域图片（按调用顺序）："}
+    ]
+    for image_path, image_base64 in images:
+        content.append({"type": "text", "text": image_path})
+        content.append({
+            "type": "image_url",
+            "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"},
+        })
+    return {"role": "user", "content": content}
+
+
+def _omit_stale_images(
+    image_messages: List[Tuple[int, Dict[str, Any], List[str]]],
+    iteration: int,
+) -> List[Tuple[int, Dict[str, Any], List[str]]]:
+    """
+    将早于最近 IMAGE_HISTORY_TURNS 轮的图片消息改写为纯文本占位
+
+    Args:
+        image_messages: (所属轮次, 图片 user 消息, 图片路径列表) 列表
+        iteration: 当前轮次
+
+    Returns:
+        仍保留图片的消息
+    """
+    kept = []
+    for turn, message, image_paths in image_messages:
+        if iteration - turn < IMAGE_HISTORY_TURNS:
+            kept.append((turn, message, image_paths))
+            continue
+        message["content"] = f"[图片已省略，可重新调用 inspect_region 查看: {', '.join(image_paths)}]"
+    return kept
+
+
 # ============================================================
 # CAD Agent 核心函数
 # ============================================================
 
-def run_cad_agent(
+async def run_cad_agent(
     file_path: str,
     task: str,
     max_iterations: int = 10
@@ -128,105 +395,120 @@ def run_cad_agent(
             }
         ]
 
-        # Agent 主循环
-        iteration = 0
-        tool_calls_history = []
+        async with _create_llm_client() as client:
+            # Agent 主循环
+            iteration = 0
+            tool_calls_history = []
+            image_messages = []
         
-        while iteration < max_iterations:
-            iteration += 1
-            print(f"\n{'='*60}")
-            print(f"迭代 {iteration}/{max_iterations}")
-            print(f"{'='*60}")
+            while iteration < max_iterations:
+                iteration += 1
+                print(f"\n{'='*60}")
+                print(f"迭代 {iteration}/{max_iterations}")
+                print(f"{'='*60}")
             
-            # 调用 LLM API
-            response = client.chat.completions.create(
-                model=MODEL_NAME,
-                messages=messages,
-                tools=CAD_AGENT_TOOLS,
-                temperature=1
-            )
+                # 调用 LLM API
+                async with _get_llm_semaphore():
+                    response = await client.chat.completions.create(
+                        model=MODEL_NAME,
+                        messages=messages,
+                        extra_body=_TOOLS_EXTRA_BODY,
+                        temperature=1
+                    )
             
-            assistant_message = response.choices[0].message
-            messages.append(assistant_message)
+                assistant_message = response.choices[0].message
+                messages.append(assistant_message)
             
-            # 检查是否有工具调用
-            if not assistant_message.tool_calls:
-                # 没有工具调用，Agent 完成分析
-                print("\n✅ Agent 完成分析")
-                return {
-                    "success": True,
-                    "data": {
-                        "analysis": assistant_message.content,
-                        "tool_calls_history": tool_calls_history,
-                        "iterations": iteration
+                # 检查是否有工具调用
+                if not assistant_message.tool_calls:
+                    # 没有工具调用，Agent 完成分析
+                    print("\n✅ Agent 完成分析")
+                    return {
+                        "success": True,
+                        "data": {
+                            "analysis": assistant_message.content,
+                            "tool_calls_history": tool_calls_history,
+                            "iterations": iteration
+                        }
                     }
-                }
             
-            # 处理工具调用
-            print(f"\n🔧 Agent 调用了 {len(assistant_message.tool_calls)} 个工具")
+                # 处理工具调用
+                print(f"\n🔧 Agent 调用了 {len(assistant_message.tool_calls)} 个工具")
             
-            for tool_call in assistant_message.tool_calls:
-                tool_name = tool_call.function.name
-                arguments = json.loads(tool_call.function.arguments)
-                
-                print(f"\n工具: {tool_name}")
-                print(f"参数: {json.dumps(arguments, ensure_ascii=False, indent=2)}")
-                
-                # 执行工具
-                result = execute_tool_call(tool_name, arguments)
-                
-                # 记录工具调用
-                tool_calls_history.append({
-                    "tool": tool_name,
-                    "arguments": arguments,
-                    "result": result
-                })
-                
-                # 如果是渲染工具，需要将图片编码为 base64
-                if tool_name == "inspect_region" and result.get("success"):
-                    image_path = result["data"]["image_path"]
-                    image_base64 = result["data"].get("image_base64")
-                    
-                    # 添加图片到消息
-                    payload = {
-                        "success": True,
-                        "image_path": image_path,
-                        "scale": result["data"]["scale"]
-                    }
-                    if image_base64:
-                        payload["image_base64"] = image_base64
+                calls = []
+                for tool_call in assistant_message.tool_calls:
+                    tool_name = tool_call.function.name
+                    arguments = json_codec.loads(tool_call.function.arguments)
 
-                    messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": json.dumps(payload, ensure_ascii=False)
-                    })
-                    
-                    print(f"✅ 渲染成功: {image_path}")
-                else:
-                    # 其他工具直接返回结果
-                    messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": json.dumps(result, ensure_ascii=False)
+                    print(f"\n工具: {tool_name}")
+                    print(f"参数: {json.dumps(arguments, ensure_ascii=False, indent=2)}")
+                    calls.append((tool_name, arguments))
+
+                # 执行工具（只读工具并行），按原顺序回填 tool 消息
+                results = await execute_tool_calls(calls)
+
+                turn_images = []
+                for tool_call, (tool_name, arguments), result in zip(assistant_message.tool_calls, calls, results):
+                    # 记录工具调用
+                    tool_calls_history.append({
+                        "tool": tool_name,
+                        "arguments": arguments,
+                        "result": result
                     })
+                
+                    # 渲染工具：tool 消息只带路径和比例，图片随后以 image_url 内容块发送
+                    if tool_name == "inspect_region" and result.get("success"):
+                        image_path = result["data"]["image_path"]
+                        image_base64 = result["data"].get("image_base64")
+
+                        payload = {
+                            "success": True,
+                            "image_path": image_path,
+                            "scale": result["data"]["region_info"]["scale"]
+                        }
+                        if image_base64:
+                            payload["image_attached"] = True
+                            turn_images.append((image_path, image_base64))
+
+                        messages.append({
+                            "role": "tool",
+                            "tool_call_id": tool_call.id,
+                            "content": json_codec.dumps(payload)
+                        })
                     
-                    if result.get("success"):
-                        print(f"✅ 执行成功")
+                        print(f"✅ 渲染成功: {image_path}")
                     else:
-                        print(f"❌ 执行失败: {result.get('error')}")
+                        # 其他工具直接返回结果
+                        messages.append({
+                            "role": "tool",
+                            "tool_call_id": tool_call.id,
+                            "content": json_codec.dumps(result)
+                        })
+                    
+                        if result.get("success"):
+                            print(f"✅ 执行成功")
+                        else:
+                            print(f"❌ 执行失败: {result.get('error')}")
+
+                # tool 消息必须紧跟 assistant 消息，图片统一放在本轮所有 tool 消息之后
+                if turn_images:
+                    image_message = _build_image_message(turn_images)
+                    messages.append(image_message)
+                    image_messages.append((iteration, image_message, [path for path, _ in turn_images]))
+
+                image_messages = _omit_stale_images(image_messages, iteration)
         
-        # 达到最大迭代次数
-        print(f"\n⚠️ 达到最大迭代次数 {max_iterations}")
-        return {
-            "success": False,
-            "error": "达到最大迭代次数",
-            "data": {
-                "tool_calls_history": tool_calls_history,
-                "iterations": iteration
+            # 达到最大迭代次数
+            print(f"\n⚠️ 达到最大迭代次数 {max_iterations}")
+            return {
+                "success": False,
+                "error": "达到最大迭代次数",
+                "data": {
+                    "tool_calls_history": tool_calls_history,
+                    "iterations": iteration
+                }
             }
-        }
-    
+
     except Exception as e:
         return {
             "success": False,
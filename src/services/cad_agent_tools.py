@@ -9,10 +9,123 @@ CAD Agent 工具定义
 4. 文件操作和格式转换
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, List, Optional
 import json
+from collections import Counter
+from functools import lru_cache
+import atexit
 import contextlib
 import io
+import os
+import threading
+
+
+# extract_cad_entities 返回的实体明细上限（计数仍覆盖全部匹配实体）
+MAX_EXTRACTED_ENTITIES = 100
+# inspect_region 返回的文字明细上限（text_count 仍覆盖区域内全部文字）
+MAX_REGION_TEXTS = 50
+MAX_APPEND_HANDLES = 16
+# 追加内容先进入句柄缓冲区，攒满或延迟到期后一次写入；本进程的读取 / 覆盖 / 列目录前会先落盘
+APPEND_BUFFER_SIZE = 64 * 1024
+APPEND_FLUSH_DELAY = 1.0
+
+# append_to_file 复用的追加句柄：绝对路径 -> 文件对象，日志式连续追加无需反复 open/close
+_APPEND_HANDLES: Dict[str, Any] = {}
+# 后台落盘失败的文件：绝对路径 -> 异常，由该路径下一次 append_to_file / flush_appends 报告
+_APPEND_ERRORS: Dict[str, OSError] = {}
+_APPEND_LOCK = threading.Lock()
+_append_flush_timer: Optional[threading.Timer] = None
+
+
+def _get_append_handle(file_path: str):
+    """返回 file_path 的追加句柄，文件被删除或替换时重新打开（调用方需持有 _APPEND_LOCK）"""
+    handle = _APPEND_HANDLES.pop(file_path, None)
+    if handle is not None:
+        try:
+            if os.stat(file_path).st_ino != os.fstat(handle.fileno()).st_ino:
+                handle.close()
+                handle = None
+        except OSError:
+            handle.close()
+            handle = None
+    if handle is None:
+        handle = open(file_path, "a", encoding="utf-8", buffering=APPEND_BUFFER_SIZE)
+    # 重新插入到末尾，超出上限时关闭最久未用的句柄
+    _APPEND_HANDLES[file_path] = handle
+    while len(_APPEND_HANDLES) > MAX_APPEND_HANDLES:
+        _APPEND_HANDLES.pop(next(iter(_APPEND_HANDLES))).close()
+    return handle
+
+
+def _discard_append_handle(file_path: str) -> None:
+    """关闭并移除 file_path 的追加句柄，丢弃写不进去的缓冲内容（调用方需持有 _APPEND_LOCK）"""
+    handle = _APPEND_HANDLES.pop(file_path, None)
+    if handle is not None:
+        try:
+            handle.close()
+        except OSError:
+            pass
+
+
+def _flush_append_buffers(file_path: Optional[str] = None) -> None:
+    """
+    落盘缓冲中的追加内容，不抛出写入错误
+
+    某个句柄写入失败（磁盘已满、目录被删除等）时记入 _APPEND_ERRORS 并丢弃该句柄，
+    其余句柄照常落盘。延迟落盘定时器和读取 / 覆盖 / 列目录前的落盘都走这里。
+
+    Args:
+        file_path: 只落盘该文件；为空时落盘全部
+    """
+    global _append_flush_timer
+    with _APPEND_LOCK:
+        if file_path is None:
+            _append_flush_timer = None
+            paths = list(_APPEND_HANDLES)
+        else:
+            path = os.path.abspath(file_path)
+            paths = [path] if path in _APPEND_HANDLES else []
+        for path in paths:
+            try:
+                _APPEND_HANDLES[path].flush()
+            except OSError as e:
+                _APPEND_ERRORS[path] = e
+                _discard_append_handle(path)
+
+
+def flush_appends(file_path: Optional[str] = None) -> Dict[str, OSError]:
+    """
+    将缓冲中的追加内容写入文件
+
+    Args:
+        file_path: 只落盘该文件；为空时落盘全部
+
+    Returns:
+        落盘失败的文件：绝对路径 -> 异常（包括此前延迟落盘时的失败，返回后即清除）
+    """
+    _flush_append_buffers(file_path)
+    with _APPEND_LOCK:
+        if file_path is None:
+            errors = dict(_APPEND_ERRORS)
+            _APPEND_ERRORS.clear()
+        else:
+            path = os.path.abspath(file_path)
+            errors = {path: _APPEND_ERRORS.pop(path)} if path in _APPEND_ERRORS else {}
+    return errors
+
+
+def close_append_handles() -> None:
+    """关闭全部追加句柄并落盘（进程退出时自动调用）"""
+    with _APPEND_LOCK:
+        for handle in _APPEND_HANDLES.values():
+            try:
+                handle.close()
+            except OSError:
+                pass
+        _APPEND_HANDLES.clear()
+
+
+atexit.register(close_append_handles)
 
 
 # ============================================================
@@ -24,21 +137,25 @@ def _encode_image_preview_base64(
     image_path: str,
     max_side: int = 768,
     jpeg_quality: int = 60,
+    image: Any = None,
 ) -> Optional[str]:
     """
     Encode a compact JPEG preview to keep tool payload token-friendly.
+
+    Pass the in-memory render as `image` to skip reading the PNG back from disk.
     """
     try:
         import base64
         import io
         from PIL import Image
 
-        with Image.open(image_path) as image:
-            image = image.convert("RGB")
-            image.thumbnail((max_side, max_side))
-            buffer = io.BytesIO()
-            image.save(buffer, format="JPEG", quality=jpeg_quality, optimize=True)
-            return base64.b64encode(buffer.getvalue()).decode("utf-8")
+        if image is None:
+            with Image.open(image_path) as source:
+                image = source.convert("RGB")
+        image.thumbnail((max_side, max_side))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=jpeg_quality, optimize=True)
+        return base64.b64encode(buffer.getvalue()).decode("utf-8")
     except Exception:
         return None
 
@@ -49,6 +166,53 @@ def _suppress_ezdxf_noise():
         yield
 
 
+@lru_cache(maxsize=None)
+def _entity_detail_extractors() -> Dict[str, Callable[[Any], Dict[str, Any]]]:
+    """
+    实体类型 -> 明细字段提取函数
+
+    每个函数只读取该类型需要的属性，调用方按类型查表一次即可，无需逐个 if/elif 判断。
+    首次调用时构建，避免导入本模块时就加载渲染依赖。
+    """
+    from ezdxf.tools.text import plain_mtext
+    from .cad_renderer import decode_cad_text
+
+    def extract_line(entity) -> Dict[str, Any]:
+        dxf = entity.dxf
+        start, end = dxf.start, dxf.end
+        return {"start": [start.x, start.y], "end": [end.x, end.y]}
+
+    def extract_circle(entity) -> Dict[str, Any]:
+        dxf = entity.dxf
+        center = dxf.center
+        return {"center": [center.x, center.y], "radius": dxf.radius}
+
+    def extract_text(entity) -> Dict[str, Any]:
+        dxf = entity.dxf
+        insert = dxf.insert
+        return {
+            "text": decode_cad_text(dxf.text),
+            "position": [insert.x, insert.y],
+            "height": getattr(dxf, "height", None),
+        }
+
+    def extract_mtext(entity) -> Dict[str, Any]:
+        dxf = entity.dxf
+        insert = dxf.insert
+        return {
+            "text": decode_cad_text(plain_mtext(entity.text)),
+            "position": [insert.x, insert.y],
+            "height": getattr(dxf, "char_height", None),
+        }
+
+    return {
+        "LINE": extract_line,
+        "CIRCLE": extract_circle,
+        "TEXT": extract_text,
+        "MTEXT": extract_mtext,
+    }
+
+
 def _iter_entities_with_virtual(msp):
     for entity in msp:
         if entity.dxftype() == "INSERT":
@@ -76,29 +240,24 @@ def get_cad_metadata(file_path: str) -> Dict[str, Any]:
     try:
         import os
         from pathlib import Path
-        import ezdxf
-        from .cad_renderer import get_renderable_bounds, render_drawing_region
+        from .cad_renderer import get_renderable_bounds, load_dxf, render_drawing_region
 
         if not os.path.exists(file_path):
             return {"success": False, "error": f"文件不存在: {file_path}"}
 
-        doc = ezdxf.readfile(file_path)
+        doc = load_dxf(file_path)
         msp = doc.modelspace()
 
-        # 提取图层信息
+        # 提取图层信息：一次遍历按 (图层, 类型) 计数，再汇总为嵌套结构
+        type_counts = Counter(
+            (getattr(entity.dxf, "layer", "0"), entity.dxftype()) for entity in msp
+        )
         layers_info = {}
-        total_entities = 0
-        for entity in msp:
-            total_entities += 1
-            layer_name = getattr(entity.dxf, "layer", "0")
-            if layer_name not in layers_info:
-                layers_info[layer_name] = {"entity_count": 0, "entity_types": {}}
-            layers_info[layer_name]["entity_count"] += 1
-
-            entity_type = entity.dxftype()
-            layers_info[layer_name]["entity_types"][entity_type] = (
-                layers_info[layer_name]["entity_types"].get(entity_type, 0) + 1
-            )
+        for (layer_name, entity_type), count in type_counts.items():
+            layer = layers_info.setdefault(layer_name, {"entity_count": 0, "entity_types": {}})
+            layer["entity_count"] += count
+            layer["entity_types"][entity_type] = count
+        total_entities = sum(type_counts.values())
 
         bounds_result = get_renderable_bounds(file_path)
         bounds = bounds_result["bounds"] if bounds_result.get("success") else None
@@ -167,27 +326,33 @@ def extract_cad_entities(
         包含实体列表和统计信息
     """
     try:
-        import ezdxf
-        from ezdxf.tools.text import plain_mtext
-        from .cad_renderer import decode_cad_text, entity_intersects_bbox
+        from .cad_renderer import load_dxf, query_entities_in_bbox
 
-        doc = ezdxf.readfile(file_path)
-        msp = doc.modelspace()
+        # 指定区域时走按文件缓存的空间索引，只遍历区域内实体
+        if bbox:
+            candidates = query_entities_in_bbox(file_path, bbox)
+        else:
+            candidates = _iter_entities_with_virtual(load_dxf(file_path).modelspace())
 
+        # 过滤条件转为集合；明细只保留前 N 个，其余实体只计数
+        type_filter = set(entity_types) if entity_types else None
+        layer_filter = set(layers) if layers else None
+        extractors = _entity_detail_extractors()
         entities = []
         entity_count = {}
 
-        for entity in _iter_entities_with_virtual(msp):
+        for entity in candidates:
             entity_type = entity.dxftype()
 
-            if entity_types and entity_type not in entity_types:
+            if type_filter and entity_type not in type_filter:
                 continue
 
             layer_name = getattr(entity.dxf, "layer", "0")
-            if layers and layer_name not in layers:
+            if layer_filter and layer_name not in layer_filter:
                 continue
 
-            if bbox and not entity_intersects_bbox(entity, bbox):
+            entity_count[entity_type] = entity_count.get(entity_type, 0) + 1
+            if len(entities) >= MAX_EXTRACTED_ENTITIES:
                 continue
 
             entity_info = {
@@ -196,32 +361,20 @@ def extract_cad_entities(
                 "color": getattr(entity.dxf, "color", None),
             }
 
-            try:
-                if entity_type == "LINE":
-                    entity_info["start"] = [entity.dxf.start.x, entity.dxf.start.y]
-                    entity_info["end"] = [entity.dxf.end.x, entity.dxf.end.y]
-                elif entity_type == "CIRCLE":
-                    entity_info["center"] = [entity.dxf.center.x, entity.dxf.center.y]
-                    entity_info["radius"] = entity.dxf.radius
-                elif entity_type == "TEXT":
-                    entity_info["text"] = decode_cad_text(entity.dxf.text)
-                    entity_info["position"] = [entity.dxf.insert.x, entity.dxf.insert.y]
-                    entity_info["height"] = getattr(entity.dxf, "height", None)
-                elif entity_type == "MTEXT":
-                    entity_info["text"] = decode_cad_text(plain_mtext(entity.text))
-                    entity_info["position"] = [entity.dxf.insert.x, entity.dxf.insert.y]
-                    entity_info["height"] = getattr(entity.dxf, "char_height", None)
-            except Exception:
-                pass
+            extractor = extractors.get(entity_type)
+            if extractor is not None:
+                try:
+                    entity_info.update(extractor(entity))
+                except Exception:
+                    pass
 
             entities.append(entity_info)
-            entity_count[entity_type] = entity_count.get(entity_type, 0) + 1
 
         return {
             "success": True,
             "data": {
-                "entities": entities[:100],  # 只返回前100个
-                "total_count": len(entities),
+                "entities": entities,  # 只返回前 MAX_EXTRACTED_ENTITIES 个
+                "total_count": sum(entity_count.values()),
                 "entity_count": entity_count,
             },
         }
@@ -277,9 +430,7 @@ def inspect_region(
         }
     """
     try:
-        import ezdxf
-        from ezdxf.tools.text import plain_mtext
-        from .cad_renderer import decode_cad_text, entity_intersects_bbox, render_drawing_region
+        from .cad_renderer import query_entities_in_bbox, render_drawing_region
 
         if width <= 0 or height <= 0:
             return {"success": False, "error": f"无效区域尺寸: width={width}, height={height}"}
@@ -290,47 +441,44 @@ def inspect_region(
             file_path,
             bbox=bbox,
             output_size=(output_size, output_size),
+            return_image=include_image_base64,
         )
         if not render_result.get("success"):
             return {"success": False, "error": f"渲染失败: {render_result['error']}"}
 
         image_path = render_result["image_path"]
 
-        image_base64 = _encode_image_preview_base64(image_path) if include_image_base64 else None
-
-        doc = ezdxf.readfile(file_path)
-        msp = doc.modelspace()
+        image_base64 = (
+            _encode_image_preview_base64(image_path, image=render_result.get("image"))
+            if include_image_base64
+            else None
+        )
 
         entities_by_type = {}
         entities_by_layer = {}
         texts = []
+        text_count = 0
+        extractors = _entity_detail_extractors()
 
-        for entity in _iter_entities_with_virtual(msp):
-            if not entity_intersects_bbox(entity, bbox):
-                continue
-
+        for entity in query_entities_in_bbox(file_path, bbox):
             entity_type = entity.dxftype()
             layer_name = getattr(entity.dxf, "layer", "0")
             entities_by_type[entity_type] = entities_by_type.get(entity_type, 0) + 1
             entities_by_layer[layer_name] = entities_by_layer.get(layer_name, 0) + 1
 
+            if entity_type not in ("TEXT", "MTEXT"):
+                continue
+            # 超出返回上限的文字只计数，不再解码
+            if len(texts) >= MAX_REGION_TEXTS:
+                text_count += 1
+                continue
             try:
-                if entity_type == "TEXT":
-                    texts.append({
-                        "text": decode_cad_text(entity.dxf.text),
-                        "position": [entity.dxf.insert.x, entity.dxf.insert.y],
-                        "height": getattr(entity.dxf, "height", None),
-                        "layer": layer_name,
-                    })
-                elif entity_type == "MTEXT":
-                    texts.append({
-                        "text": decode_cad_text(plain_mtext(entity.text)),
-                        "position": [entity.dxf.insert.x, entity.dxf.insert.y],
-                        "height": getattr(entity.dxf, "char_height", None),
-                        "layer": layer_name,
-                    })
+                text_info = extractors[entity_type](entity)
             except Exception:
-                pass
+                continue
+            text_info["layer"] = layer_name
+            texts.append(text_info)
+            text_count += 1
 
         area_m2 = round((width * height) / 1_000_000, 2)
 
@@ -350,8 +498,8 @@ def inspect_region(
                     "by_layer": entities_by_layer,
                 },
                 "key_content": {
-                    "texts": texts[:50],  # 最多返回 50 个文字
-                    "text_count": len(texts),
+                    "texts": texts,  # 最多返回 MAX_REGION_TEXTS 个文字
+                    "text_count": text_count,
                 },
             },
         }
@@ -360,6 +508,19 @@ def inspect_region(
         return {"success": False, "error": f"检查区域失败: {str(e)}"}
 
 
+def _iter_files_recursive(folder: str, prefix: str = ""):
+    """先序遍历目录，产出 (DirEntry, 相对路径)；与 Path.rglob 一样不进入符号链接目录"""
+    subdirectories = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_file():
+                yield entry, os.path.join(prefix, entry.name)
+            elif entry.is_dir(follow_symlinks=False):
+                subdirectories.append(entry)
+    for entry in subdirectories:
+        yield from _iter_files_recursive(entry.path, os.path.join(prefix, entry.name))
+
+
 def list_files(working_folder: str, recursive: bool = False) -> Dict[str, Any]:
     """
     列出 working folder 中的所有文件和文件夹
@@ -372,7 +533,6 @@ def list_files(working_folder: str, recursive: bool = False) -> Dict[str, Any]:
         文件和文件夹列表
     """
     try:
-        import os
         from pathlib import Path
 
         folder_path = Path(working_folder)
@@ -383,6 +543,9 @@ def list_files(working_folder: str, recursive: bool = False) -> Dict[str, Any]:
                 "error": f"文件夹不存在: {working_folder}"
             }
 
+        # 文件大小要包含缓冲中的追加内容
+        _flush_append_buffers()
+
         if not folder_path.is_dir():
             return {
                 "success": False,
@@ -394,31 +557,32 @@ def list_files(working_folder: str, recursive: bool = False) -> Dict[str, Any]:
 
         if recursive:
             # 递归列出所有文件
-            for item in folder_path.rglob("*"):
-                if item.is_file():
-                    relative_path = item.relative_to(folder_path)
-                    files.append({
-                        "name": item.name,
-                        "path": str(relative_path),
-                        "size": item.stat().st_size,
-                        "modified": item.stat().st_mtime
-                    })
+            for entry, relative_path in _iter_files_recursive(str(folder_path)):
+                stat = entry.stat()
+                files.append({
+                    "name": entry.name,
+                    "path": relative_path,
+                    "size": stat.st_size,
+                    "modified": stat.st_mtime
+                })
         else:
-            # 只列出当前目录
-            for item in folder_path.iterdir():
-                if item.is_file():
-                    files.append({
-                        "name": item.name,
-                        "type": "file",
-                        "size": item.stat().st_size,
-                        "modified": item.stat().st_mtime
-                    })
-                elif item.is_dir():
-                    directories.append({
-                        "name": item.name,
-                        "type": "directory",
-                        "modified": item.stat().st_mtime
-                    })
+            # 只列出当前目录；DirEntry 自带类型信息，每项最多一次 stat
+            with os.scandir(folder_path) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        files.append({
+                            "name": entry.name,
+                            "type": "file",
+                            "size": stat.st_size,
+                            "modified": stat.st_mtime
+                        })
+                    elif entry.is_dir():
+                        directories.append({
+                            "name": entry.name,
+                            "type": "directory",
+                            "modified": entry.stat().st_mtime
+                        })
 
         return {
             "success": True,
@@ -453,6 +617,7 @@ def read_file(working_folder: str, filename: str) -> Dict[str, Any]:
         from pathlib import Path
 
         file_path = Path(working_folder) / filename
+        _flush_append_buffers(str(file_path))
 
         if not file_path.exists():
             return {
@@ -497,6 +662,8 @@ def write_file(working_folder: str, filename: str, content: str) -> Dict[str, An
         folder_path.mkdir(parents=True, exist_ok=True)
 
         file_path = folder_path / filename
+        # 先写出之前的追加内容，保证覆盖写在其之后生效
+        _flush_append_buffers(str(file_path))
         file_path.write_text(content, encoding='utf-8')
 
         return {
@@ -535,9 +702,27 @@ def append_to_file(working_folder: str, filename: str, content: str) -> Dict[str
 
         file_path = folder_path / filename
 
-        # 追加模式
-        with open(file_path, 'a', encoding='utf-8') as f:
-            f.write(content)
+        # 追加模式；写入句柄缓冲区，攒满 APPEND_BUFFER_SIZE、被读取或 APPEND_FLUSH_DELAY 秒后落盘
+        global _append_flush_timer
+        with _APPEND_LOCK:
+            path = os.path.abspath(file_path)
+            # 之前缓冲的内容落盘失败时先报告，本次内容不追加
+            previous_error = _APPEND_ERRORS.pop(path, None)
+            if previous_error is not None:
+                return {
+                    "success": False,
+                    "error": f"追加文件失败: 之前追加的内容未能写入 ({previous_error})，本次内容未追加"
+                }
+            try:
+                handle = _get_append_handle(path)
+                handle.write(content)
+            except OSError:
+                _discard_append_handle(path)
+                raise
+            if _append_flush_timer is None:
+                _append_flush_timer = threading.Timer(APPEND_FLUSH_DELAY, _flush_append_buffers)
+                _append_flush_timer.daemon = True
+                _append_flush_timer.start()
 
         return {
             "success": True,
@@ -569,9 +754,9 @@ def convert_dwg_to_dxf(dwg_path: str, output_path: Optional[str] = None, delete_
     """
     try:
         import os
-        from .oda_converter import ODAConverter
+        from .oda_converter import get_converter
 
-        converter = ODAConverter()
+        converter = get_converter()
 
         if not converter.is_available():
             return {
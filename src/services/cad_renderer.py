@@ -10,10 +10,15 @@ import os
 import io
 import warnings
 import contextlib
+import shutil
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import matplotlib.patches as patches
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib import font_manager
 
@@ -41,6 +46,10 @@ MAX_FONT_PX = 18.0
 TEXT_FONT_SCALE = 0.75
 OVERVIEW_PPU_THRESHOLD = 0.02
 RENDERABLE_ENTITY_TYPES = {"LINE", "CIRCLE", "ARC", "LWPOLYLINE", "POLYLINE", "TEXT", "MTEXT"}
+DXF_CACHE_SIZE = 4
+# 渲染图只供查看与视觉模型使用，用最快的 zlib 档位：体积略增，编码耗时大幅下降
+PNG_COMPRESS_LEVEL = 1
+RENDER_CACHE_SIZE = 32
 _CJK_FONT_CANDIDATES = [
     "PingFang SC",
     "Hiragino Sans GB",
@@ -53,6 +62,10 @@ _CJK_FONT_CANDIDATES = [
     "Arial Unicode MS",
 ]
 _TEXT_FONT = None
+# 绝对路径 -> 该文件的解析锁：同一文件的并发请求只解析一次，不同文件互不等待
+_DXF_LOAD_LOCKS: Dict[str, threading.Lock] = {}
+# 渲染参数 -> (渲染结果, PNG 的 mtime_ns, PNG 大小)
+_RENDER_CACHE: "OrderedDict[Tuple[Any, ...], Tuple[Dict[str, Any], int, int]]" = OrderedDict()
 
 
 @contextlib.contextmanager
@@ -64,6 +77,132 @@ def _suppress_ezdxf_noise():
         yield
 
 
+def load_dxf(file_path: str):
+    """
+    读取 DXF 文档（按 路径 + mtime + 文件大小 缓存）。
+
+    元数据、边界、渲染、实体提取通常先后作用于同一文件，缓存后只解析一次；
+    文件被改写时 mtime/大小变化会自动失效。返回的文档为共享对象，调用方只读不改。
+    """
+    stat = os.stat(file_path)
+    abs_path = os.path.abspath(file_path)
+    # 并发工具调用可能同时请求同一文件，按路径加锁避免重复解析；已缓存的文件不必等待其他文件的解析
+    with _dxf_load_lock(abs_path):
+        return _load_dxf_cached(abs_path, stat.st_mtime_ns, stat.st_size)["doc"]
+
+
+def _dxf_load_lock(abs_path: str) -> threading.Lock:
+    # dict.setdefault 是原子操作，并发调用拿到的是同一把锁
+    return _DXF_LOAD_LOCKS.setdefault(abs_path, threading.Lock())
+
+
+@lru_cache(maxsize=DXF_CACHE_SIZE)
+def _load_dxf_cached(abs_path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """
+    解析 DXF，返回缓存条目 {"doc": 文档, "index": 实体索引}。
+
+    实体索引首次区域查询时才填入同一条目：虚拟实体引用着文档，放在同一缓存中才能与文档一起淘汰。
+    """
+    import ezdxf
+
+    return {"doc": ezdxf.readfile(abs_path), "index": None}
+
+
+def query_entities_in_bbox(file_path: str, bbox: Dict[str, float]) -> List[Any]:
+    """
+    返回与 bbox 相交的实体（含块参照展开的虚拟实体），保持图纸遍历顺序。
+
+    判定与 entity_intersects_bbox 一致，但借助按文件缓存的实体边界数组一次完成，
+    局部区域查询无需逐个实体重新计算边界。
+    """
+    entities, boxes = _entity_index(file_path)
+    x1, y1, x2, y2 = _bbox_tuple(bbox)
+    # 无边界实体的行为 NaN，比较结果恒为 False，自然被排除
+    mask = (boxes[:, 2] >= x1) & (boxes[:, 0] <= x2) & (boxes[:, 3] >= y1) & (boxes[:, 1] <= y2)
+    return [entities[i] for i in np.flatnonzero(mask)]
+
+
+def _entity_index(file_path: str) -> Tuple[List[Any], np.ndarray]:
+    """实体列表 + 对应的 (min_x, min_y, max_x, max_y) 数组，与文档缓存同一条目、同时失效。"""
+    stat = os.stat(file_path)
+    abs_path = os.path.abspath(file_path)
+    with _dxf_load_lock(abs_path):
+        entry = _load_dxf_cached(abs_path, stat.st_mtime_ns, stat.st_size)
+        if entry["index"] is None:
+            msp = entry["doc"].modelspace()
+            entities = list(_iter_entities(msp, include_insert_virtual=True))
+            no_bbox = (np.nan, np.nan, np.nan, np.nan)
+            boxes = np.array([_entity_bbox(entity) or no_bbox for entity in entities], dtype=np.float64)
+            entry["index"] = (entities, boxes.reshape(-1, 4))
+        return entry["index"]
+
+
+def _render_cache_key(
+    file_path: str,
+    bbox: Dict[str, float],
+    output_size: Tuple[int, int],
+    layers: Optional[List[str]],
+    color_mode: str,
+    maintain_aspect_ratio: bool,
+) -> Tuple[Any, ...]:
+    stat = os.stat(file_path)
+    return (
+        os.path.abspath(file_path),
+        stat.st_mtime_ns,
+        stat.st_size,
+        float(bbox["x"]),
+        float(bbox["y"]),
+        float(bbox["width"]),
+        float(bbox["height"]),
+        tuple(output_size),
+        tuple(layers) if layers else None,
+        color_mode,
+        maintain_aspect_ratio,
+    )
+
+
+def _get_cached_render(key: Tuple[Any, ...], output_path: str) -> Optional[Dict[str, Any]]:
+    """
+    命中时返回之前的渲染结果；目标路径不同则复制 PNG 而不重新栅格化。
+
+    默认输出路径只由 bbox 决定，可能被其他图纸的同区域渲染覆盖，
+    因此复用前校验 PNG 的 mtime/大小与缓存时一致。
+    """
+    entry = _RENDER_CACHE.get(key)
+    if entry is None:
+        return None
+
+    result, png_mtime_ns, png_size = entry
+    cached_path = result["image_path"]
+    try:
+        stat = os.stat(cached_path)
+    except OSError:
+        stat = None
+    if stat is None or (stat.st_mtime_ns, stat.st_size) != (png_mtime_ns, png_size):
+        del _RENDER_CACHE[key]
+        return None
+
+    _RENDER_CACHE.move_to_end(key)
+    if os.path.abspath(output_path) != os.path.abspath(cached_path):
+        shutil.copyfile(cached_path, output_path)
+    return {
+        **result,
+        "image_path": output_path,
+        "actual_bbox": dict(result["actual_bbox"]),
+        "output_size": list(result["output_size"]),
+    }
+
+
+def _put_cached_render(key: Tuple[Any, ...], result: Dict[str, Any]) -> None:
+    stat = os.stat(result["image_path"])
+    # 拷贝可变字段，避免调用方之后修改返回值影响缓存
+    snapshot = {**result, "actual_bbox": dict(result["actual_bbox"]), "output_size": list(result["output_size"])}
+    _RENDER_CACHE[key] = (snapshot, stat.st_mtime_ns, stat.st_size)
+    _RENDER_CACHE.move_to_end(key)
+    while len(_RENDER_CACHE) > RENDER_CACHE_SIZE:
+        _RENDER_CACHE.popitem(last=False)
+
+
 def get_layer_color(layer_name: str) -> str:
     """获取图层颜色"""
     layer_upper = str(layer_name).upper()
@@ -120,7 +259,7 @@ def get_renderable_bounds(
         if not os.path.exists(file_path):
             return {"success": False, "error": f"文件不存在: {file_path}"}
 
-        doc = ezdxf.readfile(file_path)
+        doc = load_dxf(file_path)
         msp = doc.modelspace()
 
         boxes: List[Tuple[float, float, float, float]] = []
@@ -168,9 +307,13 @@ def render_drawing_region(
     output_path: Optional[str] = None,
     color_mode: str = "by_layer",
     maintain_aspect_ratio: bool = True,
+    return_image: bool = False,
 ) -> Dict[str, Any]:
     """
     渲染指定坐标区域为 PNG 图片。
+
+    return_image=True 时额外返回内存中的 PIL 图像（"image"），调用方无需再读回 PNG 解码；
+    命中渲染缓存时不含该字段。
     """
     try:
         import ezdxf
@@ -183,15 +326,20 @@ def render_drawing_region(
         if width <= 0 or height <= 0:
             return {"success": False, "error": f"无效 bbox: {bbox}"}
 
-        doc = ezdxf.readfile(file_path)
-        msp = doc.modelspace()
-
         if not output_path:
             output_dir = Path("workspace/rendered")
             output_dir.mkdir(parents=True, exist_ok=True)
             filename = f"region_{int(bbox['x'])}_{int(bbox['y'])}_{int(width)}_{int(height)}.png"
             output_path = str(output_dir / filename)
 
+        # 同一文件、同一区域和参数的重复渲染（如 inspect_region 紧跟独立渲染）直接复用
+        cache_key = _render_cache_key(file_path, bbox, output_size, layers, color_mode, maintain_aspect_ratio)
+        cached = _get_cached_render(cache_key, output_path)
+        if cached is not None:
+            return cached
+
+        entities = query_entities_in_bbox(file_path, bbox)
+
         if maintain_aspect_ratio:
             aspect_ratio = width / height
             max_width, max_height = output_size
@@ -218,33 +366,55 @@ def render_drawing_region(
         ax.set_axis_off()
 
         pixels_per_unit = actual_width / width
-        _render_entities(ax, msp, bbox, layers, color_mode, pixels_per_unit)
+        _render_entities(ax, entities, layers, color_mode, pixels_per_unit)
 
         # 禁用 bbox_inches='tight'，避免文字外扩导致导出尺寸爆炸。
+        write_png = Path(output_path).suffix.lower() == ".png"
         with warnings.catch_warnings():
             warnings.filterwarnings(
                 "ignore",
                 message=r"Glyph .* missing from font\(s\).*",
                 category=UserWarning,
             )
-            fig.savefig(
-                output_path,
-                dpi=DEFAULT_DPI,
-                facecolor="white",
-                edgecolor="white",
-                transparent=False,
-            )
+            if write_png:
+                # 画布只绘制一次，PNG 由 Pillow 直接从画布缓冲区编码
+                fig.canvas.draw()
+            else:
+                fig.savefig(
+                    output_path,
+                    dpi=DEFAULT_DPI,
+                    facecolor="white",
+                    edgecolor="white",
+                    transparent=False,
+                )
+
+        image = None
+        if write_png or return_image:
+            from PIL import Image
+
+            # 背景不透明，去掉 alpha 通道；convert 会复制一份，关闭 figure 后仍可用
+            image = Image.frombuffer(
+                "RGBA", fig.canvas.get_width_height(), fig.canvas.buffer_rgba(), "raw", "RGBA", 0, 1
+            ).convert("RGB")
+            if write_png:
+                image.save(output_path, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+            if not return_image:
+                image = None
 
         plt.close(fig)
         gc.collect()
 
-        return {
+        result = {
             "success": True,
             "image_path": output_path,
             "actual_bbox": bbox,
             "scale": round(pixels_per_unit, 6),
             "output_size": [actual_width, actual_height],
         }
+        _put_cached_render(cache_key, result)
+        if image is not None:
+            result["image"] = image
+        return result
 
     except ImportError:
         return {"success": False, "error": "需要安装 ezdxf 和 matplotlib"}
@@ -265,12 +435,11 @@ def entity_intersects_bbox(entity: Any, bbox: Dict[str, float]) -> bool:
     return _boxes_intersect(entity_bbox, _bbox_tuple(bbox))
 
 
-def _render_entities(ax, msp, bbox, layers, color_mode, pixels_per_unit):
-    """渲染实体到 matplotlib axes。"""
-    bbox_tuple = _bbox_tuple(bbox)
+def _render_entities(ax, entities, layers, color_mode, pixels_per_unit):
+    """渲染实体到 matplotlib axes（entities 已按区域筛选）。"""
     text_kwargs = _get_text_font_kwargs()
 
-    for entity in _iter_entities(msp, include_insert_virtual=True):
+    for entity in entities:
         entity_type = entity.dxftype()
         if entity_type not in RENDERABLE_ENTITY_TYPES:
             continue
@@ -279,9 +448,6 @@ def _render_entities(ax, msp, bbox, layers, color_mode, pixels_per_unit):
         if layers and entity_layer not in layers:
             continue
 
-        if not _boxes_intersect(_entity_bbox(entity), bbox_tuple):
-            continue
-
         color = get_layer_color(entity_layer) if color_mode == "by_layer" else DEFAULT_COLOR
 
         try:
@@ -7,48 +7,356 @@ DWG 到 DXF 转换服务 - 基于 ODA File Converter
 
 import os
 import json
+import hashlib
+import shutil
 import tempfile
 import subprocess
-from pathlib import Path
-from typing import Dict, Any, Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Tuple
+
+# 单次 ODA 调用的默认超时（秒）
+DEFAULT_CONVERSION_TIMEOUT = 300
+
+# ODA 命令行的固定参数：输出类型与布尔开关
+ODA_OUTPUT_TYPE = "DXF"
+_FLAG_ARGS = ("0", "1")
+
+# ODA 输出版本名与 DXF 头部 $ACADVER 的对应关系
+DXF_VERSION_CODES = {
+    "ACAD9": "AC1004",
+    "ACAD10": "AC1006",
+    "ACAD12": "AC1009",
+    "ACAD13": "AC1012",
+    "ACAD14": "AC1014",
+    "ACAD2000": "AC1015",
+    "ACAD2004": "AC1018",
+    "ACAD2007": "AC1021",
+    "ACAD2010": "AC1024",
+    "ACAD2013": "AC1027",
+    "ACAD2018": "AC1032",
+}
+
+# 转换缓存默认容量上限
+DEFAULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# 计算缓存键时每次读取的字节数
+CACHE_HASH_CHUNK_SIZE = 1024 * 1024
+
+# 使用 ODA_TMPFS_DIR 暂存时要求的剩余空间（DWG 总大小的倍数，DXF 通常比 DWG 大数倍）
+TMPFS_SIZE_FACTOR = 8
+
+
+def _max_parallel() -> int:
+    """读取 ODA_MAX_PARALLEL 环境变量限制的 ODA 并发进程数（部分版本并发时会争用授权文件）"""
+    try:
+        return max(int(os.getenv("ODA_MAX_PARALLEL", "4")), 1)
+    except ValueError:
+        return 1
+
+
+def _cache_dir() -> str:
+    """转换缓存目录（ODA_CACHE_DIR 环境变量，默认系统临时目录下的 oda_dxf_cache）"""
+    return os.path.join(os.getenv("ODA_CACHE_DIR", tempfile.gettempdir()), "oda_dxf_cache")
+
+
+def _cache_max_bytes() -> int:
+    """转换缓存容量上限（ODA_CACHE_MAX_BYTES 环境变量，0 表示禁用缓存）"""
+    try:
+        return max(int(os.getenv("ODA_CACHE_MAX_BYTES", str(DEFAULT_CACHE_MAX_BYTES))), 0)
+    except ValueError:
+        return DEFAULT_CACHE_MAX_BYTES
+
+
+def _cache_key(dwg_path: str, dxf_version: str, audit: bool) -> Optional[str]:
+    """
+    计算转换缓存键：DWG 内容的 SHA-256 + 输出版本 + 审计开关
+
+    Returns:
+        缓存键，缓存禁用时返回 None
+    """
+    if _cache_max_bytes() == 0:
+        return None
+    digest = hashlib.sha256()
+    with open(dwg_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CACHE_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return f"{digest.hexdigest()}_{dxf_version}_{int(audit)}"
+
+
+def _load_cached(cache_key: Optional[str], dxf_path: str) -> bool:
+    """
+    缓存命中时把缓存的 DXF 复制到 dxf_path
+
+    Returns:
+        是否命中
+    """
+    if cache_key is None:
+        return False
+    cached_path = os.path.join(_cache_dir(), cache_key + ".dxf")
+    try:
+        shutil.copyfile(cached_path, dxf_path)
+        # 刷新 mtime，供按最近使用时间淘汰
+        os.utime(cached_path)
+    except OSError:
+        return False
+    return True
+
+
+def _store_cached(cache_key: Optional[str], dxf_path: str) -> None:
+    """
+    把转换结果复制一份存入缓存，并按 mtime 淘汰最旧的条目直到不超过容量上限
+
+    复制而不是硬链接：调用方之后原地修改输出文件时不会污染缓存。
+    """
+    if cache_key is None:
+        return
+    cache_dir = _cache_dir()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # 先写唯一的临时文件再改名，并发转换（多进程或同进程多线程）时读不到写了一半的缓存
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as dst, open(dxf_path, "rb") as src:
+                shutil.copyfileobj(src, dst)
+            os.replace(temp_path, os.path.join(cache_dir, cache_key + ".dxf"))
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+        entries = []
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".dxf"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        max_bytes = _cache_max_bytes()
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            # 其他线程或进程可能已删除同一条目，跳过即可
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+    except OSError:
+        # 缓存失败不影响转换结果
+        pass
+
+
+def _pick_staging_dir(dwg_paths: List[str], fallback_dir: str) -> str:
+    """
+    选择 ODA 暂存目录的父目录
+
+    默认使用 fallback_dir（输出文件旁）：与目标同一文件系统，转换结果直接改名落位，不占内存。
+    设置 ODA_TMPFS_DIR（如 Linux 的 /dev/shm）且剩余空间足够时改用该内存文件系统，
+    ODA 的中间读写不落盘，但结果需跨文件系统复制到输出位置。
+    macOS 可用 `hdiutil attach -nomount ram://<扇区数>` 创建内存盘，格式化挂载后将 ODA_TMPFS_DIR 指向它。
+
+    Args:
+        dwg_paths: 待转换的 DWG 文件路径
+        fallback_dir: 默认父目录
+
+    Returns:
+        暂存目录的父目录
+    """
+    tmpfs_dir = os.getenv("ODA_TMPFS_DIR")
+    if tmpfs_dir and os.path.isdir(tmpfs_dir):
+        needed = TMPFS_SIZE_FACTOR * sum(os.path.getsize(path) for path in dwg_paths)
+        try:
+            if shutil.disk_usage(tmpfs_dir).free >= needed:
+                return tmpfs_dir
+        except OSError:
+            pass
+
+    return fallback_dir
+
+
+def _stage_file(src: str, dst: str) -> None:
+    """
+    将输入文件暂存到 dst：优先符号链接，其次硬链接，都不支持时才复制
+
+    Args:
+        src: 源文件路径
+        dst: 暂存路径
+    """
+    try:
+        os.symlink(os.path.abspath(src), dst)
+        return
+    except (OSError, NotImplementedError):
+        pass
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    shutil.copy2(src, dst)
+
+
+def _move_file(src: str, dst: str) -> None:
+    """
+    将文件移动到 dst（覆盖已有文件）；同一文件系统内只是改名，跨文件系统时回退为复制
+
+    Args:
+        src: 源文件路径
+        dst: 目标路径
+    """
+    try:
+        os.replace(src, dst)
+    except OSError:
+        shutil.move(src, dst)
+
+
+def _plan_conversions(
+    dwg_paths: List[str],
+    output_path: Optional[str]
+) -> Tuple[List[Tuple[str, str]], List[Dict[str, str]]]:
+    """
+    校验批量转换的输入并确定每个 DXF 的目标路径
+
+    不同目录下的同名 DWG 输出到同一目录时目标路径相同，只保留第一个，其余记为失败，
+    避免后转换的文件静默覆盖前一个。
+
+    Args:
+        dwg_paths: DWG 文件路径列表
+        output_path: 输出目录（None 表示与各 DWG 同目录）
+
+    Returns:
+        ((DWG 路径, DXF 路径) 列表, 失败项列表)
+    """
+    jobs = []
+    failed = []
+    claimed = {}
+    for dwg_path in dwg_paths:
+        if not os.path.isfile(dwg_path):
+            failed.append({"dwg_path": dwg_path, "error": f"文件不存在: {dwg_path}"})
+            continue
+        root, extension = os.path.splitext(dwg_path)
+        if extension.lower() != '.dwg':
+            failed.append({"dwg_path": dwg_path, "error": f"不是 DWG 文件: {dwg_path}"})
+            continue
+
+        if output_path is None:
+            dxf_path = root + '.dxf'
+        else:
+            dxf_path = os.path.join(output_path, os.path.basename(root) + '.dxf')
+
+        target = os.path.normcase(os.path.abspath(dxf_path))
+        if target in claimed:
+            failed.append({
+                "dwg_path": dwg_path,
+                "error": f"输出路径冲突: {dxf_path} 已由 {claimed[target]} 占用"
+            })
+            continue
+        claimed[target] = dwg_path
+        jobs.append((dwg_path, dxf_path))
+
+    return jobs, failed
+
+
+def _read_dxf_version(dxf_path: str) -> Optional[str]:
+    """
+    从 ASCII DXF 文件开头读取 $ACADVER（如 AC1032），不解析整个文件
+
+    Args:
+        dxf_path: DXF 文件路径
+
+    Returns:
+        版本代码，读取不到时返回 None
+    """
+    with open(dxf_path, "rb") as f:
+        head = f.read(1024)
+
+    lines = [line.strip() for line in head.decode("latin-1").splitlines()]
+    try:
+        index = lines.index("$ACADVER")
+    except ValueError:
+        return None
+    # $ACADVER 后为组码 1 与版本值
+    if index + 2 < len(lines) and lines[index + 1] == "1":
+        return lines[index + 2]
+    return None
+
+
+def _count_dxf(root: str, recursive: bool) -> int:
+    """
+    统计目录下的 DXF 文件数（只看文件名后缀，不构造 Path 对象）
+
+    Args:
+        root: 目录路径
+        recursive: 是否包含子目录
+
+    Returns:
+        DXF 文件数
+    """
+    if recursive:
+        return sum(
+            1
+            for _, _, filenames in os.walk(root)
+            for name in filenames
+            if name.endswith(".dxf")
+        )
+
+    with os.scandir(root) as it:
+        return sum(1 for entry in it if entry.name.endswith(".dxf") and entry.is_file())
+
+
+@lru_cache(maxsize=1)
+def _find_oda_converter() -> Optional[str]:
+    """
+    自动查找 ODA File Converter 安装路径（进程内只搜索一次）
+
+    Returns:
+        可执行文件路径，如果未找到返回 None
+    """
+    # macOS 常见安装位置
+    possible_paths = [
+        "/Applications/ODAFileConverter.app/Contents/MacOS/ODAFileConverter",
+        "/usr/local/bin/ODAFileConverter",
+        os.path.expanduser("~/Applications/ODAFileConverter.app/Contents/MacOS/ODAFileConverter"),
+    ]
+
+    for path in possible_paths:
+        if os.access(path, os.X_OK):
+            return path
+
+    return None
 
 
 class ODAConverter:
     """ODA File Converter 包装器"""
 
-    def __init__(self, oda_path: Optional[str] = None):
+    def __init__(
+        self,
+        oda_path: Optional[str] = None,
+        verbose: bool = False,
+        timeout: int = DEFAULT_CONVERSION_TIMEOUT
+    ):
         """
         初始化 ODA 转换器
 
         Args:
             oda_path: ODA File Converter 可执行文件路径
                      如果为 None，会自动搜索常见安装位置
+            verbose: 是否捕获 ODA 的标准输出（逐文件进度，调试用）
+            timeout: 单次 ODA 调用的超时秒数（大批量转换时可调高）
         """
-        self.oda_path = oda_path or self._find_oda_converter()
-
-    def _find_oda_converter(self) -> Optional[str]:
-        """
-        自动查找 ODA File Converter 安装路径
-
-        Returns:
-            可执行文件路径，如果未找到返回 None
-        """
-        # macOS 常见安装位置
-        possible_paths = [
-            "/Applications/ODAFileConverter.app/Contents/MacOS/ODAFileConverter",
-            "/usr/local/bin/ODAFileConverter",
-            os.path.expanduser("~/Applications/ODAFileConverter.app/Contents/MacOS/ODAFileConverter"),
-        ]
-
-        for path in possible_paths:
-            if os.path.exists(path) and os.access(path, os.X_OK):
-                return path
-
-        return None
+        self.oda_path = oda_path or _find_oda_converter()
+        self.verbose = verbose
+        self.timeout = timeout
+        self._available = self.oda_path is not None and os.access(self.oda_path, os.X_OK)
 
     def is_available(self) -> bool:
-        """检查 ODA File Converter 是否可用"""
-        return self.oda_path is not None and os.path.exists(self.oda_path)
+        """检查 ODA File Converter 是否可用（构造时检查一次）"""
+        return self._available
 
     def convert_dwg_to_dxf(
         self,
@@ -56,7 +364,8 @@ class ODAConverter:
         output_path: Optional[str] = None,
         dxf_version: str = "ACAD2018",
         recursive: bool = False,
-        audit: bool = True
+        audit: bool = True,
+        force: bool = False
     ) -> Dict[str, Any]:
         """
         将 DWG 文件转换为 DXF 格式
@@ -68,6 +377,7 @@ class ODAConverter:
                         ACAD2000, ACAD2004, ACAD2007, ACAD2010, ACAD2013, ACAD2018)
             recursive: 是否递归处理子目录
             audit: 是否在转换前审计文件
+            force: 单文件模式下即使输出已是最新（比 DWG 新且版本一致）也重新转换
 
         Returns:
             Dict 包含:
@@ -95,7 +405,7 @@ class ODAConverter:
 
             if input_is_file:
                 # 单文件转换
-                if not dwg_path.lower().endswith('.dwg'):
+                if os.path.splitext(dwg_path)[1].lower() != '.dwg':
                     return {
                         "success": False,
                         "error": f"不是 DWG 文件: {dwg_path}"
@@ -104,52 +414,55 @@ class ODAConverter:
                 # 确定输出路径
                 if output_path is None:
                     output_path = dwg_path.rsplit('.', 1)[0] + '.dxf'
-
-                # 创建临时目录用于转换
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    # 复制文件到临时目录
-                    import shutil
-                    temp_input = os.path.join(temp_dir, "input")
-                    temp_output = os.path.join(temp_dir, "output")
-                    os.makedirs(temp_input)
-                    os.makedirs(temp_output)
-
-                    temp_dwg = os.path.join(temp_input, os.path.basename(dwg_path))
-                    shutil.copy2(dwg_path, temp_dwg)
-
-                    # 执行转换
-                    result = self._run_conversion(
-                        temp_input,
-                        temp_output,
-                        dxf_version,
-                        recursive=False,
-                        audit=audit
+                elif os.path.isdir(output_path):
+                    # 输出到目录时沿用 DWG 的文件名
+                    output_path = os.path.join(
+                        output_path,
+                        os.path.splitext(os.path.basename(dwg_path))[0] + '.dxf'
                     )
 
-                    if not result["success"]:
-                        return result
-
-                    # 复制转换后的文件
-                    converted_files = list(Path(temp_output).glob("*.dxf"))
-                    if not converted_files:
+                # 输出文件比 DWG 新且版本与请求一致时直接复用，跳过整个 ODA 调用
+                if not force:
+                    try:
+                        output_stat = os.stat(output_path)
+                        is_fresh = (
+                            output_stat.st_mtime >= os.stat(dwg_path).st_mtime
+                            and _read_dxf_version(output_path) == DXF_VERSION_CODES.get(dxf_version)
+                        )
+                    except OSError:
+                        is_fresh = False
+                    if is_fresh:
                         return {
-                            "success": False,
-                            "error": "转换失败：未生成 DXF 文件"
+                            "success": True,
+                            "data": {
+                                "output_path": output_path,
+                                "file_size": output_stat.st_size,
+                                "converter": "oda",
+                                "cached": True
+                            }
                         }
 
-                    shutil.copy2(str(converted_files[0]), output_path)
-
-                    file_size = os.path.getsize(output_path)
+                result = self._convert_files([(dwg_path, output_path)], dxf_version, audit)
+                if not result["success"]:
+                    return result
 
+                if result["data"]["missing"]:
                     return {
-                        "success": True,
-                        "data": {
-                            "output_path": output_path,
-                            "file_size": file_size,
-                            "converter": "oda"
-                        }
+                        "success": False,
+                        "error": "转换失败：未生成 DXF 文件"
                     }
 
+                file_size = os.path.getsize(output_path)
+
+                return {
+                    "success": True,
+                    "data": {
+                        "output_path": output_path,
+                        "file_size": file_size,
+                        "converter": "oda"
+                    }
+                }
+
             else:
                 # 目录批量转换
                 if output_path is None:
@@ -167,8 +480,7 @@ class ODAConverter:
 
                 if result["success"]:
                     # 统计转换的文件数
-                    converted_files = list(Path(output_path).rglob("*.dxf") if recursive else Path(output_path).glob("*.dxf"))
-                    result["data"]["files_converted"] = len(converted_files)
+                    result["data"]["files_converted"] = _count_dxf(output_path, recursive)
 
                 return result
 
@@ -178,6 +490,232 @@ class ODAConverter:
                 "error": f"转换失败: {str(e)}"
             }
 
+    def convert_many(
+        self,
+        dwg_paths: List[str],
+        output_path: Optional[str] = None,
+        dxf_version: str = "ACAD2018",
+        audit: bool = True
+    ) -> Dict[str, Any]:
+        """
+        批量转换多个 DWG 文件，只启动一次 ODA 进程
+
+        Args:
+            dwg_paths: DWG 文件路径列表
+            output_path: 输出目录（可选，默认每个 DXF 与其 DWG 同名同目录）
+            dxf_version: DXF 版本
+            audit: 是否在转换前审计文件
+
+        Returns:
+            Dict 包含:
+            - success: bool（全部转换成功时为 True）
+            - data: {output_path, files_converted, files: [...], failed: [...]}
+            - error: str (如果失败)
+        """
+        try:
+            if not self.is_available():
+                return {
+                    "success": False,
+                    "error": "ODA File Converter 未安装。请从以下地址下载: https://www.opendesign.com/guestfiles/oda_file_converter"
+                }
+
+            if not dwg_paths:
+                return {
+                    "success": False,
+                    "error": "未提供 DWG 文件"
+                }
+
+            if output_path is not None:
+                os.makedirs(output_path, exist_ok=True)
+
+            # 先校验输入，不合法或输出路径冲突的文件不进入 ODA
+            jobs, failed = _plan_conversions(dwg_paths, output_path)
+
+            files = []
+            if jobs:
+                result = self._convert_files(jobs, dxf_version, audit)
+                if not result["success"]:
+                    return result
+
+                for dwg_path, dxf_path in result["data"]["converted"]:
+                    files.append({
+                        "dwg_path": dwg_path,
+                        "output_path": dxf_path,
+                        "file_size": os.path.getsize(dxf_path)
+                    })
+                for dwg_path in result["data"]["missing"]:
+                    failed.append({"dwg_path": dwg_path, "error": "转换失败：未生成 DXF 文件"})
+
+            response = {
+                "success": not failed,
+                "data": {
+                    "output_path": output_path,
+                    "files_converted": len(files),
+                    "files": files,
+                    "failed": failed,
+                    "converter": "oda"
+                }
+            }
+            if failed:
+                response["error"] = f"{len(failed)} 个文件转换失败"
+            return response
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"批量转换失败: {str(e)}"
+            }
+
+    def convert_many_parallel(
+        self,
+        dwg_paths: List[str],
+        output_path: Optional[str] = None,
+        dxf_version: str = "ACAD2018",
+        audit: bool = True,
+        workers: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        将文件分片后并发运行多个 ODA 进程批量转换
+
+        ODA 以子进程运行，线程只负责等待，因此用线程池驱动即可。
+
+        Args:
+            dwg_paths: DWG 文件路径列表
+            output_path: 输出目录（可选，默认与各 DWG 同目录）
+            dxf_version: DXF 版本
+            audit: 是否在转换前审计文件
+            workers: 并发 ODA 进程数（默认 CPU 核数，且不超过 ODA_MAX_PARALLEL）
+
+        Returns:
+            与 convert_many 相同结构的汇总结果
+        """
+        # 分片前统一校验，确保不同分片的文件也不会写到同一输出路径
+        jobs, planning_failed = _plan_conversions(dwg_paths, output_path)
+        workers = min(
+            workers or os.cpu_count() or 1,
+            _max_parallel(),
+            len(jobs)
+        )
+        if workers <= 1:
+            return self.convert_many(dwg_paths, output_path, dxf_version, audit)
+
+        valid_paths = [dwg_path for dwg_path, _ in jobs]
+        shards = [valid_paths[index::workers] for index in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                lambda shard: self.convert_many(shard, output_path, dxf_version, audit),
+                shards
+            ))
+
+        # 整体失败（如 ODA 不可用、进程报错）时直接返回第一个错误
+        for result in results:
+            if "data" not in result:
+                return result
+
+        files = [item for result in results for item in result["data"]["files"]]
+        failed = planning_failed + [item for result in results for item in result["data"]["failed"]]
+        response = {
+            "success": not failed,
+            "data": {
+                "output_path": output_path,
+                "files_converted": len(files),
+                "files": files,
+                "failed": failed,
+                "converter": "oda"
+            }
+        }
+        if failed:
+            response["error"] = f"{len(failed)} 个文件转换失败"
+        return response
+
+    @staticmethod
+    def clear_cache() -> None:
+        """清空 DWG→DXF 转换缓存"""
+        shutil.rmtree(_cache_dir(), ignore_errors=True)
+
+    def _convert_files(
+        self,
+        jobs: List[Tuple[str, str]],
+        dxf_version: str,
+        audit: bool
+    ) -> Dict[str, Any]:
+        """
+        在一个暂存目录中用一次 ODA 调用转换多个 DWG，并把结果移动到各自的目标路径
+
+        Args:
+            jobs: (DWG 路径, 目标 DXF 路径) 列表
+            dxf_version: DXF 版本
+            audit: 是否审计
+
+        Returns:
+            转换结果，data.converted 为已落位的 (DWG, DXF) 列表，data.missing 为未生成 DXF 的 DWG 路径
+        """
+        # 内容哈希命中缓存的文件直接取出，不再交给 ODA
+        converted = []
+        missing = []
+        pending = []
+        for dwg_path, dxf_path in jobs:
+            cache_key = _cache_key(dwg_path, dxf_version, audit)
+            if _load_cached(cache_key, dxf_path):
+                converted.append((dwg_path, dxf_path))
+            else:
+                pending.append((dwg_path, dxf_path, cache_key))
+
+        if not pending:
+            return {
+                "success": True,
+                "data": {
+                    "converted": converted,
+                    "missing": missing
+                }
+            }
+
+        staging_parent = _pick_staging_dir(
+            [dwg_path for dwg_path, _, _ in pending],
+            os.path.dirname(os.path.abspath(pending[0][1]))
+        )
+        with tempfile.TemporaryDirectory(dir=staging_parent) as temp_dir:
+            temp_input = os.path.join(temp_dir, "input")
+            temp_output = os.path.join(temp_dir, "output")
+            os.makedirs(temp_input)
+            os.makedirs(temp_output)
+
+            # 以链接方式暂存输入，避免复制整个 DWG；序号前缀防止不同目录下的同名文件冲突
+            staged = {}
+            for index, (dwg_path, dxf_path, cache_key) in enumerate(pending):
+                stem = f"{index}_{os.path.splitext(os.path.basename(dwg_path))[0]}"
+                _stage_file(dwg_path, os.path.join(temp_input, stem + '.dwg'))
+                staged[stem] = (dwg_path, dxf_path, cache_key)
+
+            result = self._run_conversion(
+                temp_input,
+                temp_output,
+                dxf_version,
+                recursive=False,
+                audit=audit
+            )
+
+            if not result["success"]:
+                return result
+
+            # ODA 输出与输入同名，直接检查预期文件，不扫描输出目录
+            for stem, (dwg_path, dxf_path, cache_key) in staged.items():
+                produced_path = os.path.join(temp_output, stem + '.dxf')
+                if not os.path.exists(produced_path):
+                    missing.append(dwg_path)
+                    continue
+                _move_file(produced_path, dxf_path)
+                _store_cached(cache_key, dxf_path)
+                converted.append((dwg_path, dxf_path))
+
+        return {
+            "success": True,
+            "data": {
+                "converted": converted,
+                "missing": missing
+            }
+        }
+
     def _run_conversion(
         self,
         input_dir: str,
@@ -207,23 +745,26 @@ class ODAConverter:
                 input_dir,           # Quoted Input Folder
                 output_dir,          # Quoted Output Folder
                 output_version,      # Output_version (ACAD2018, etc.)
-                "DXF",              # Output File type
-                "1" if recursive else "0",  # Recurse Input Folder
-                "1" if audit else "0"       # Audit each file
+                ODA_OUTPUT_TYPE,     # Output File type
+                _FLAG_ARGS[bool(recursive)],  # Recurse Input Folder
+                _FLAG_ARGS[bool(audit)]       # Audit each file
             ]
 
-            # 执行转换
+            # 执行转换；逐文件进度输出默认丢弃，只保留 stderr 用于报错
             result = subprocess.run(
                 cmd,
-                capture_output=True,
-                text=True,
-                timeout=300
+                stdout=subprocess.PIPE if self.verbose else subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                bufsize=65536,
+                timeout=self.timeout
             )
 
             if result.returncode != 0:
+                output = result.stderr or result.stdout or b""
+                message = output.decode("utf-8", errors="replace") or f"返回码 {result.returncode}"
                 return {
                     "success": False,
-                    "error": f"ODA 转换失败: {result.stderr or result.stdout}"
+                    "error": f"ODA 转换失败: {message}"
                 }
 
             return {
@@ -236,7 +777,7 @@ class ODAConverter:
         except subprocess.TimeoutExpired:
             return {
                 "success": False,
-                "error": "转换超时（超过5分钟）"
+                "error": f"转换超时（超过{self.timeout}秒）"
             }
         except Exception as e:
             return {
@@ -282,3 +823,30 @@ def convert_dwg_to_dxf(
         dxf_version,
         **kwargs
     )
+
+
+def convert_dwg_to_dxf_batch(
+    dwg_paths: List[str],
+    output_path: Optional[str] = None,
+    dxf_version: str = "ACAD2018",
+    **kwargs
+) -> Dict[str, Any]:
+    """
+    便捷函数：批量转换多个 DWG 文件（按 ODA_MAX_PARALLEL 并发分片）
+
+    Args:
+        dwg_paths: DWG 文件路径列表
+        output_path: 输出目录（可选，默认与各 DWG 同目录）
+        dxf_version: DXF 版本（默认 ACAD2018）
+        **kwargs: 其他参数传递给 ODAConverter.convert_many_parallel
+
+    Returns:
+        Dict 包含转换结果
+    """
+    converter = get_converter()
+    return converter.convert_many_parallel(
+        dwg_paths,
+        output_path,
+        dxf_version,
+        **kwargs
+    )
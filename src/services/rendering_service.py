@@ -13,6 +13,8 @@ from pathlib import Path
 from typing import Dict, Any, List, Optional, Tuple
 import math
 
+import numpy as np
+
 
 def get_drawing_bounds(
     file_path: str,
@@ -35,7 +37,7 @@ def get_drawing_bounds(
         - error: str (如果失败)
     """
     try:
-        import ezdxf
+        from .cad_renderer import load_dxf
 
         if not os.path.exists(file_path):
             return {
@@ -43,16 +45,18 @@ def get_drawing_bounds(
                 "error": f"文件不存在: {file_path}"
             }
 
-        # 读取 DXF 文件
-        doc = ezdxf.readfile(file_path)
+        # 读取 DXF 文件（与渲染共用文档缓存）
+        doc = load_dxf(file_path)
         msp = doc.modelspace()
 
         # 计算图纸边界
         min_x, min_y = float('inf'), float('inf')
         max_x, max_y = float('-inf'), float('-inf')
 
-        # 存储所有实体的位置信息
-        entity_positions = []
+        # 实体中心点与图层（用于区域识别），按列存放便于批量计算网格
+        center_xs: List[float] = []
+        center_ys: List[float] = []
+        entity_layers: List[str] = []
 
         for entity in msp:
             # 图层过滤
@@ -69,12 +73,9 @@ def get_drawing_bounds(
                     max_y = max(max_y, bbox['max_y'])
 
                     # 记录实体位置（用于区域识别）
-                    entity_positions.append({
-                        'center_x': (bbox['min_x'] + bbox['max_x']) / 2,
-                        'center_y': (bbox['min_y'] + bbox['max_y']) / 2,
-                        'layer': entity.dxf.layer,
-                        'type': entity.dxftype()
-                    })
+                    center_xs.append((bbox['min_x'] + bbox['max_x']) / 2)
+                    center_ys.append((bbox['min_y'] + bbox['max_y']) / 2)
+                    entity_layers.append(entity.dxf.layer)
             except:
                 continue
 
@@ -100,7 +101,9 @@ def get_drawing_bounds(
 
         # 识别关键区域
         regions = _identify_key_regions(
-            entity_positions,
+            center_xs,
+            center_ys,
+            entity_layers,
             bounds,
             grid_size
         )
@@ -109,7 +112,7 @@ def get_drawing_bounds(
             "success": True,
             "bounds": bounds,
             "regions": regions,
-            "total_entities": len(entity_positions)
+            "total_entities": len(entity_layers)
         }
 
     except ImportError as e:
@@ -208,7 +211,7 @@ def _get_entity_bbox(entity) -> Optional[Dict[str, float]]:
     return None
 
 
-def _create_full_region(entity_positions: List[Dict], bounds: Dict[str, float]) -> Dict[str, Any]:
+def _create_full_region(entity_layers: List[str], bounds: Dict[str, float]) -> Dict[str, Any]:
     """创建全图区域（作为后备方案）"""
     return {
         "name": "全图区域",
@@ -218,15 +221,17 @@ def _create_full_region(entity_positions: List[Dict], bounds: Dict[str, float])
             "width": bounds["width"],
             "height": bounds["height"]
         },
-        "entity_count": len(entity_positions),
-        "density": len(entity_positions) / (bounds["width"] * bounds["height"]) if bounds["width"] * bounds["height"] > 0 else 0,
-        "layers": list(set(e['layer'] for e in entity_positions)),
+        "entity_count": len(entity_layers),
+        "density": len(entity_layers) / (bounds["width"] * bounds["height"]) if bounds["width"] * bounds["height"] > 0 else 0,
+        "layers": list(set(entity_layers)),
         "grid_count": 1
     }
 
 
 def _identify_key_regions(
-    entity_positions: List[Dict],
+    center_xs: List[float],
+    center_ys: List[float],
+    entity_layers: List[str],
     bounds: Dict[str, float],
     grid_size: int
 ) -> List[Dict[str, Any]]:
@@ -235,47 +240,59 @@ def _identify_key_regions(
 
     使用网格密度分析识别实体集中的区域
     """
-    if not entity_positions:
+    if not entity_layers:
         return []
 
-    # 步骤 1: 将实体分配到网格
-    grid_map = {}  # {(grid_x, grid_y): {"entities": [...], "layers": set()}}
-
-    for entity in entity_positions:
-        grid_x = int(entity['center_x'] // grid_size)
-        grid_y = int(entity['center_y'] // grid_size)
-        grid_key = (grid_x, grid_y)
-
-        if grid_key not in grid_map:
-            grid_map[grid_key] = {"entities": [], "layers": set()}
-
-        grid_map[grid_key]["entities"].append(entity)
-        grid_map[grid_key]["layers"].add(entity['layer'])
-
-    # 步骤 2: 计算密度阈值（使用中位数）
-    entity_counts = [len(g["entities"]) for g in grid_map.values()]
-    entity_counts.sort()
-
-    if len(entity_counts) == 0:
-        return []
+    # 步骤 1: 将实体分配到网格（整列计算网格坐标，排序后按相同网格分组计数）
+    grid_xs = np.floor_divide(np.asarray(center_xs, dtype=np.float64), grid_size).astype(np.int64)
+    grid_ys = np.floor_divide(np.asarray(center_ys, dtype=np.float64), grid_size).astype(np.int64)
+    order = np.lexsort((grid_ys, grid_xs))
+    sorted_xs = grid_xs[order]
+    sorted_ys = grid_ys[order]
+    is_group_start = np.empty(len(order), dtype=bool)
+    is_group_start[0] = True
+    is_group_start[1:] = (sorted_xs[1:] != sorted_xs[:-1]) | (sorted_ys[1:] != sorted_ys[:-1])
+    group_starts = np.flatnonzero(is_group_start)
+    entity_counts = np.diff(np.append(group_starts, len(order)))
+    # 每个实体所属网格编号，以及每个网格首个实体的原始下标
+    grid_index = np.empty(len(order), dtype=np.int64)
+    grid_index[order] = np.cumsum(is_group_start) - 1
+    first_index = np.minimum.reduceat(order, group_starts)
+
+    # 步骤 2: 计算密度阈值
+    sorted_counts = np.sort(entity_counts)
 
     # 使用 75 分位数作为高密度阈值
-    percentile_75_idx = int(len(entity_counts) * 0.75)
-    density_threshold = entity_counts[percentile_75_idx] if percentile_75_idx < len(entity_counts) else entity_counts[-1]
+    percentile_75_idx = int(len(sorted_counts) * 0.75)
+    density_threshold = int(sorted_counts[min(percentile_75_idx, len(sorted_counts) - 1)])
 
     # 至少要有 3 个实体才算高密度
     density_threshold = max(density_threshold, 3)
 
-    # 步骤 3: 筛选高密度网格
+    # 步骤 3: 筛选高密度网格，只为这些网格收集图层
+    is_dense = entity_counts >= density_threshold
+    if not is_dense.any():
+        # 如果没有高密度区域，返回全图
+        return [_create_full_region(entity_layers, bounds)]
+
+    dense_entities = np.flatnonzero(is_dense[grid_index])
+    grid_layers: Dict[int, set] = {}
+    for grid, entity_idx in zip(grid_index[dense_entities].tolist(), dense_entities.tolist()):
+        grid_layers.setdefault(grid, set()).add(entity_layers[entity_idx])
+
+    # 按网格首次出现的顺序排列，保持聚类与同密度区域的顺序稳定
+    dense_grids = np.flatnonzero(is_dense)
+    dense_grids = dense_grids[np.argsort(first_index[dense_grids], kind="stable")]
     high_density_grids = {
-        k: v for k, v in grid_map.items()
-        if len(v["entities"]) >= density_threshold
+        (grid_x, grid_y): {"entity_count": count, "layers": grid_layers[grid]}
+        for grid, grid_x, grid_y, count in zip(
+            dense_grids.tolist(),
+            sorted_xs[group_starts[dense_grids]].tolist(),
+            sorted_ys[group_starts[dense_grids]].tolist(),
+            entity_counts[dense_grids].tolist(),
+        )
     }
 
-    if not high_density_grids:
-        # 如果没有高密度区域，返回全图
-        return [_create_full_region(entity_positions, bounds)]
-
     # 步骤 4: 聚类相邻网格
     from .region_utils import cluster_grids
     regions = cluster_grids(high_density_grids, grid_size)
@@ -283,7 +300,7 @@ def _identify_key_regions(
     # 步骤 5: 按密度排序
     regions.sort(key=lambda r: r['density'], reverse=True)
 
-    return regions if regions else [_create_full_region(entity_positions, bounds)]
+    return regions if regions else [_create_full_region(entity_layers, bounds)]
 
 
 # 工具定义
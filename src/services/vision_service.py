@@ -7,18 +7,52 @@
 - 其他OpenAI兼容的视觉模型
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import os
+import asyncio
 import base64
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from openai import AsyncOpenAI, OpenAI
 from dotenv import load_dotenv
 
 # 加载环境变量
 load_dotenv()
 
+# 批量视觉分析的最大并发请求数
+MAX_VISION_WORKERS = 8
 
+# 各详细程度上传给视觉模型的图片最长边（像素）
+VISION_MAX_EDGE = {
+    "low": 768,
+    "medium": 1152,
+    "high": 1568,
+}
+
+
+def create_async_vision_client() -> AsyncOpenAI:
+    """
+    创建异步视觉模型客户端
+
+    不做进程级缓存：AsyncOpenAI 的连接池绑定创建它的事件循环，跨 asyncio.run 复用会报
+    "Event loop is closed"。调用方在一次事件循环内用 async with 管理其生命周期。
+    """
+    base_url = os.getenv("VISION_MODEL_BASE_URL", "https://api.moonshot.cn/v1")
+    api_key = os.getenv("VISION_MODEL_API_KEY")
+
+    if not api_key:
+        raise ValueError("未配置VISION_MODEL_API_KEY环境变量")
+
+    return AsyncOpenAI(base_url=base_url, api_key=api_key)
+
+
+@lru_cache(maxsize=1)
 def get_vision_client():
-    """获取视觉模型客户端"""
+    """
+    获取视觉模型客户端（进程内复用同一实例，保持 HTTP 连接池）
+
+    修改 VISION_MODEL_* 环境变量后需调用 get_vision_client.cache_clear() 才会生效。
+    """
     base_url = os.getenv("VISION_MODEL_BASE_URL", "https://api.moonshot.cn/v1")
     api_key = os.getenv("VISION_MODEL_API_KEY")
 
@@ -28,6 +62,91 @@ def get_vision_client():
     return OpenAI(base_url=base_url, api_key=api_key)
 
 
+def _prepare_image_for_vision(
+    image_path: str,
+    max_edge: int = 1568,
+    quality: int = 85
+) -> bytes:
+    """
+    将图片缩放到最长边不超过 max_edge 并转码为 JPEG，减小上传体积
+
+    视觉模型内部会把图片缩到 1000~1600 像素左右，上传 2048 像素的 PNG 只是浪费带宽。
+
+    Args:
+        image_path: 图片路径
+        max_edge: 最长边像素上限
+        quality: JPEG 质量
+
+    Returns:
+        JPEG 字节
+    """
+    import io
+    from PIL import Image
+
+    with Image.open(image_path) as source:
+        image = source.convert("RGB")
+    image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _image_data_url(image_bytes: bytes, mime_type: str = "image/jpeg") -> str:
+    """
+    将图片字节编码为 data URL
+
+    Args:
+        image_bytes: 图片字节
+        mime_type: MIME 类型
+
+    Returns:
+        data URL 字符串
+    """
+    # base64 为纯 ASCII，按 ASCII 解码即可
+    return f"data:{mime_type};base64," + base64.b64encode(image_bytes).decode("ascii")
+
+
+def _render_regions(
+    file_path: str,
+    regions: List[Dict[str, Any]],
+    layers: Optional[list]
+) -> List[Dict[str, Any]]:
+    """
+    在本进程依次渲染多个区域，返回与 regions 一一对应的渲染结果
+
+    复用 get_drawing_bounds 刚解析并缓存的图纸。不用进程池：spawn 的 worker 需重新解析 DXF，
+    fork 则可能在其他线程持有 DXF 加载锁时复制出死锁的子进程，而实测 fork 与顺序渲染耗时相当。
+    """
+    from services.cad_renderer import render_drawing_region
+
+    return [
+        render_drawing_region(
+            file_path,
+            bbox=region["bbox"],
+            output_size=(2048, 2048),
+            layers=layers
+        )
+        for region in regions
+    ]
+
+
+def _collect_region_renders(
+    regions: List[Dict[str, Any]],
+    results: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """从渲染结果中挑出成功的区域，生成索引用的区域信息"""
+    return [
+        {
+            "name": region["name"],
+            "bbox": region["bbox"],
+            "entity_count": region["entity_count"],
+            "image_path": result["image_path"]
+        }
+        for region, result in zip(regions, results)
+        if result["success"]
+    ]
+
+
 def convert_cad_to_image(
     file_path: str,
     output_format: str = "png",
@@ -101,22 +220,9 @@ def convert_cad_to_image(
             # 渲染前 max_regions 个高密度区域
             regions = bounds_result["regions"][:max_regions]
 
-            for i, region in enumerate(regions, 1):
-                result = render_drawing_region(
-                    file_path,
-                    bbox=region["bbox"],
-                    output_size=(2048, 2048),
-                    layers=layers
-                )
-
-                if result["success"]:
-                    image_paths.append(result["image_path"])
-                    regions_info.append({
-                        "name": region["name"],
-                        "bbox": region["bbox"],
-                        "entity_count": region["entity_count"],
-                        "image_path": result["image_path"]
-                    })
+            results = _render_regions(file_path, regions, layers)
+            regions_info = _collect_region_renders(regions, results)
+            image_paths = [info["image_path"] for info in regions_info]
 
         # 保存索引文件
         from pathlib import Path
@@ -183,16 +289,136 @@ def analyze_drawing_visual(
                 "error": f"图片文件不存在: {image_path}"
             }
 
-        # 读取图片并转为base64
-        with open(image_path, "rb") as f:
-            image_data = base64.b64encode(f.read()).decode("utf-8")
+        request = _build_vision_request(image_path, analysis_goal, detail_level)
+
+        # 调用视觉模型
+        response = get_vision_client().chat.completions.create(**request)
+
+        return _save_visual_analysis(
+            image_path,
+            analysis_goal,
+            detail_level,
+            request["model"],
+            response.choices[0].message.content
+        )
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"视觉分析失败: {str(e)}"
+        }
+
+
+async def analyze_drawing_visual_async(
+    image_path: str,
+    analysis_goal: str,
+    detail_level: str = "medium",
+    client: Optional[AsyncOpenAI] = None
+) -> Dict[str, Any]:
+    """
+    analyze_drawing_visual 的异步版本，返回结构相同
+
+    Args:
+        image_path: 图片路径
+        analysis_goal: 分析目标
+        detail_level: 详细程度（low/medium/high）
+        client: 异步客户端（可选，未提供时为本次调用创建并在结束后关闭）
+
+    Returns:
+        与 analyze_drawing_visual 相同
+    """
+    try:
+        if not os.path.exists(image_path):
+            return {
+                "success": False,
+                "error": f"图片文件不存在: {image_path}"
+            }
+
+        # 图片缩放转码是 CPU 工作，放到线程中避免阻塞事件循环
+        request = await asyncio.to_thread(_build_vision_request, image_path, analysis_goal, detail_level)
+
+        # 调用视觉模型
+        if client is None:
+            async with create_async_vision_client() as owned_client:
+                response = await owned_client.chat.completions.create(**request)
+        else:
+            response = await client.chat.completions.create(**request)
+
+        return await asyncio.to_thread(
+            _save_visual_analysis,
+            image_path,
+            analysis_goal,
+            detail_level,
+            request["model"],
+            response.choices[0].message.content
+        )
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"视觉分析失败: {str(e)}"
+        }
+
+
+async def analyze_many(
+    image_paths: List[str],
+    analysis_goal: str,
+    detail_level: str = "medium"
+) -> List[Dict[str, Any]]:
+    """
+    在事件循环中并发分析多张图片，并发数受 MAX_VISION_WORKERS 限制（遵守接口 QPS 限制）
+
+    同步调用方使用 analyze_drawing_visual_batch。
+
+    Args:
+        image_paths: 图片路径列表
+        analysis_goal: 分析目标
+        detail_level: 详细程度（low/medium/high）
+
+    Returns:
+        与 image_paths 一一对应的分析结果列表
+    """
+    if not image_paths:
+        return []
+
+    try:
+        client = create_async_vision_client()
+    except ValueError as e:
+        return [{"success": False, "error": f"视觉分析失败: {str(e)}"} for _ in image_paths]
+
+    semaphore = asyncio.Semaphore(MAX_VISION_WORKERS)
+
+    async def analyze(image_path: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await analyze_drawing_visual_async(image_path, analysis_goal, detail_level, client)
 
-        # 获取模型配置
-        model_name = os.getenv("VISION_MODEL_NAME", "moonshot-v1-vision")
-        client = get_vision_client()
+    # 客户端只在本次事件循环内共享，结束时关闭连接池
+    async with client:
+        return list(await asyncio.gather(*(analyze(image_path) for image_path in image_paths)))
 
-        # 构建提示词
-        prompt = f"""你是一个专业的工程图纸分析助手。
+
+def _build_vision_request(
+    image_path: str,
+    analysis_goal: str,
+    detail_level: str
+) -> Dict[str, Any]:
+    """
+    构建视觉模型请求参数（模型名、消息、温度）
+
+    Args:
+        image_path: 图片路径
+        analysis_goal: 分析目标
+        detail_level: 详细程度
+
+    Returns:
+        chat.completions.create 的关键字参数
+    """
+    # 按详细程度缩放并转码为 JPEG，再编码为 data URL
+    max_edge = VISION_MAX_EDGE.get(detail_level, VISION_MAX_EDGE["medium"])
+    image_url = _image_data_url(_prepare_image_for_vision(image_path, max_edge=max_edge))
+
+    # 构建提示词
+    prompt = f"""你是一个专业的工程图纸分析助手。
 
 分析目标：{analysis_goal}
 
@@ -201,83 +427,114 @@ def analyze_drawing_visual(
 详细程度：{detail_level}
 """
 
-        # 调用视觉模型
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{image_data}"
-                            }
+    return {
+        "model": os.getenv("VISION_MODEL_NAME", "moonshot-v1-vision"),
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": image_url
                         }
-                    ]
-                }
-            ],
-            temperature=1,  # Kimi 2.5 要求 temperature=1
-        )
+                    }
+                ]
+            }
+        ],
+        "temperature": 1,  # Kimi 2.5 要求 temperature=1
+    }
 
-        analysis_text = response.choices[0].message.content
 
-        # 保存完整分析到文件
-        from pathlib import Path
-        from datetime import datetime
-
-        image_name = Path(image_path).stem
-        output_dir = Path("workspace/cost/notes")
-        output_dir.mkdir(parents=True, exist_ok=True)
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        analysis_file = output_dir / f"visual_analysis_{image_name}_{timestamp}.md"
-
-        with open(analysis_file, 'w', encoding='utf-8') as f:
-            f.write(f"# 视觉分析报告\n\n")
-            f.write(f"**图片**: {image_path}\n")
-            f.write(f"**分析目标**: {analysis_goal}\n")
-            f.write(f"**详细程度**: {detail_level}\n")
-            f.write(f"**模型**: {model_name}\n")
-            f.write(f"**时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write("---\n\n")
-            f.write(analysis_text)
-
-        # 提取关键发现（前几行的要点）
-        lines = analysis_text.split('\n')
-        key_findings = []
-        for line in lines[:15]:
-            line = line.strip()
-            if line and (line.startswith('-') or line.startswith('•') or
-                        (len(line) > 0 and line[0].isdigit() and '.' in line[:3])):
-                clean_line = line.lstrip('-•0123456789. ').strip()
-                if clean_line:
-                    key_findings.append(clean_line)
-                if len(key_findings) >= 5:
-                    break
-
-        # 生成简短摘要
-        summary = analysis_text[:200].replace('\n', ' ').strip()
-        if len(analysis_text) > 200:
-            summary += "..."
+def _save_visual_analysis(
+    image_path: str,
+    analysis_goal: str,
+    detail_level: str,
+    model_name: str,
+    analysis_text: str
+) -> Dict[str, Any]:
+    """
+    保存完整分析到文件，并提取关键发现和摘要
 
-        return {
-            "success": True,
-            "data": {
-                "analysis_file": str(analysis_file),
-                "summary": summary,
-                "key_findings": key_findings,
-                "full_length": len(analysis_text),
-                "model_used": model_name
-            }
+    Returns:
+        analyze_drawing_visual 的成功结果
+    """
+    # 保存完整分析到文件
+    from pathlib import Path
+    from datetime import datetime
+
+    image_name = Path(image_path).stem
+    output_dir = Path("workspace/cost/notes")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    analysis_file = output_dir / f"visual_analysis_{image_name}_{timestamp}.md"
+
+    with open(analysis_file, 'w', encoding='utf-8') as f:
+        f.write(f"# 视觉分析报告\n\n")
+        f.write(f"**图片**: {image_path}\n")
+        f.write(f"**分析目标**: {analysis_goal}\n")
+        f.write(f"**详细程度**: {detail_level}\n")
+        f.write(f"**模型**: {model_name}\n")
+        f.write(f"**时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        f.write("---\n\n")
+        f.write(analysis_text)
+
+    # 提取关键发现（前几行的要点）
+    lines = analysis_text.split('\n')
+    key_findings = []
+    for line in lines[:15]:
+        line = line.strip()
+        if line and (line.startswith('-') or line.startswith('•') or
+                    (len(line) > 0 and line[0].isdigit() and '.' in line[:3])):
+            clean_line = line.lstrip('-•0123456789. ').strip()
+            if clean_line:
+                key_findings.append(clean_line)
+            if len(key_findings) >= 5:
+                break
+
+    # 生成简短摘要
+    summary = analysis_text[:200].replace('\n', ' ').strip()
+    if len(analysis_text) > 200:
+        summary += "..."
+
+    return {
+        "success": True,
+        "data": {
+            "analysis_file": str(analysis_file),
+            "summary": summary,
+            "key_findings": key_findings,
+            "full_length": len(analysis_text),
+            "model_used": model_name
         }
+    }
 
-    except Exception as e:
-        return {
-            "success": False,
-            "error": f"视觉分析失败: {str(e)}"
-        }
+
+def analyze_drawing_visual_batch(
+    image_paths: List[str],
+    analysis_goal: str,
+    detail_level: str = "medium"
+) -> List[Dict[str, Any]]:
+    """
+    并发分析多张图片（视觉调用以网络等待为主，用线程池重叠请求）
+
+    Args:
+        image_paths: 图片路径列表
+        analysis_goal: 分析目标
+        detail_level: 详细程度（low/medium/high）
+
+    Returns:
+        与 image_paths 一一对应的 analyze_drawing_visual 结果列表
+    """
+    if not image_paths:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(len(image_paths), MAX_VISION_WORKERS)) as executor:
+        return list(executor.map(
+            lambda image_path: analyze_drawing_visual(image_path, analysis_goal, detail_level),
+            image_paths
+        ))
 
 
 def extract_drawing_annotations(image_path: str) -> Dict[str, Any]:
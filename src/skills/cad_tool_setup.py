@@ -2,10 +2,12 @@
 Shared CAD tool registration helpers for skill setup modules.
 """
 
+import asyncio
+import functools
 import json
 import os
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional
 
 from src.core.skills.tool_registry import get_tool_registry
 from src.services.cad_agent_tools import (
@@ -21,15 +23,29 @@ from src.services.cad_agent_tools import (
 )
 
 
+def _run_in_thread(func: Callable[..., Dict[str, Any]]) -> Callable[..., Any]:
+    """
+    Wrap a blocking file tool so the registry awaits it off the event loop.
+
+    Only used for plain file I/O; rendering tools rely on pyplot global state
+    and stay on the calling thread.
+    """
+    @functools.wraps(func)
+    async def wrapper(**kwargs):
+        return await asyncio.to_thread(func, **kwargs)
+
+    return wrapper
+
+
 CAD_TOOL_FUNCTIONS = {
     "get_cad_metadata": get_cad_metadata,
     "inspect_region": inspect_region,
     "extract_cad_entities": extract_cad_entities,
     "convert_dwg_to_dxf": convert_dwg_to_dxf,
-    "list_files": list_files,
-    "read_file": read_file,
-    "write_file": write_file,
-    "append_to_file": append_to_file,
+    "list_files": _run_in_thread(list_files),
+    "read_file": _run_in_thread(read_file),
+    "write_file": _run_in_thread(write_file),
+    "append_to_file": _run_in_thread(append_to_file),
 }
 
 
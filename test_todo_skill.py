@@ -3,6 +3,7 @@
 """
 import asyncio
 import sys
+import traceback
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
@@ -63,7 +64,6 @@ async def test_todo_skill():
 
             except Exception as e:
                 print(f"❌ 处理消息时出错: {str(e)}")
-                import traceback
                 traceback.print_exc()
                 break
 
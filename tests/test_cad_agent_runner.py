@@ -0,0 +1,135 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pytest
+
+# cad_agent_runner imports its siblings as top-level packages from src/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import services.cad_agent_runner as runner
+
+
+class _BrokenExecutor:
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool("worker died")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.fixture
+def executed(monkeypatch):
+    """Run CAD tools in a thread pool and record every executed call."""
+    calls = []
+
+    def fake_execute_tool_call(tool_name, arguments):
+        calls.append((tool_name, arguments))
+        data = {"tool": tool_name, "arguments": arguments}
+        if "image_path" in arguments:
+            data["image_path"] = arguments["image_path"]
+        return {"success": True, "data": data}
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    runner._tool_result_cache.clear()
+    monkeypatch.setattr(runner, "execute_tool_call", fake_execute_tool_call)
+    monkeypatch.setattr(runner, "_tool_executor", executor)
+    yield calls
+    runner._tool_result_cache.clear()
+    executor.shutdown()
+
+
+def _dxf(tmp_path, name="plan.dxf", content="0\nEOF\n"):
+    path = tmp_path / name
+    path.write_text(content)
+    return str(path)
+
+
+@pytest.mark.asyncio
+async def test_results_follow_call_order_around_write_barriers(tmp_path, executed):
+    dxf_path = _dxf(tmp_path)
+    calls = [
+        ("inspect_region", {"file_path": dxf_path, "x": 0}),
+        ("read_file", {"working_folder": str(tmp_path), "filename": "log.md"}),
+        ("write_file", {"working_folder": str(tmp_path), "filename": "log.md", "content": "x"}),
+        ("extract_cad_entities", {"file_path": dxf_path}),
+        ("list_files", {"working_folder": str(tmp_path)}),
+    ]
+
+    results = await runner.execute_tool_calls(calls)
+
+    assert [(r["data"]["tool"], r["data"]["arguments"]) for r in results] == calls
+    order = [tool_name for tool_name, _ in executed]
+    assert set(order[:2]) == {"inspect_region", "read_file"}
+    assert order[2] == "write_file"
+    assert set(order[3:]) == {"extract_cad_entities", "list_files"}
+
+
+@pytest.mark.asyncio
+async def test_identical_calls_in_one_batch_run_once(tmp_path, executed):
+    call = ("extract_cad_entities", {"file_path": _dxf(tmp_path), "entity_types": ["TEXT"]})
+
+    results = await runner.execute_tool_calls([call, call])
+
+    assert len(executed) == 1
+    assert results[0] == results[1]
+    assert results[0] is not results[1]
+
+
+@pytest.mark.asyncio
+async def test_cached_result_is_dropped_when_the_drawing_changes(tmp_path, executed):
+    dxf_path = _dxf(tmp_path)
+    call = ("extract_cad_entities", {"file_path": dxf_path})
+
+    await runner.execute_tool_calls([call])
+    await runner.execute_tool_calls([call])
+    assert len(executed) == 1
+
+    Path(dxf_path).write_text("0\nSECTION\n0\nEOF\n")
+    await runner.execute_tool_calls([call])
+    assert len(executed) == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_result_is_dropped_when_its_image_is_overwritten(tmp_path, executed):
+    image_path = tmp_path / "region.png"
+    image_path.write_bytes(b"first render")
+    call = ("inspect_region", {"file_path": _dxf(tmp_path), "image_path": str(image_path)})
+
+    await runner.execute_tool_calls([call])
+    await runner.execute_tool_calls([call])
+    assert len(executed) == 1
+
+    image_path.write_bytes(b"another drawing's render")
+    await runner.execute_tool_calls([call])
+    assert len(executed) == 2
+
+
+@pytest.mark.asyncio
+async def test_broken_pool_returns_errors_and_is_recreated(tmp_path, monkeypatch):
+    broken = _BrokenExecutor()
+    monkeypatch.setattr(runner, "_tool_executor", broken)
+    missing = str(tmp_path / "missing.dxf")
+
+    # Both read-only calls on one drawing go to the broken pool as a single task
+    results = await runner.execute_tool_calls([
+        ("get_cad_metadata", {"file_path": missing}),
+        ("extract_cad_entities", {"file_path": missing}),
+    ])
+
+    assert [r["success"] for r in results] == [False, False]
+    assert all("工作进程异常退出" in r["error"] for r in results)
+    assert broken.shut_down
+    assert runner._tool_executor is None
+
+    try:
+        results = await runner.execute_tool_calls([("unknown_tool", {})])
+        assert results == [{"success": False, "error": "未知工具: unknown_tool"}]
+        assert isinstance(runner._tool_executor, runner.ProcessPoolExecutor)
+    finally:
+        if runner._tool_executor is not None:
+            runner._tool_executor.shutdown()
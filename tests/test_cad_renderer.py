@@ -2,6 +2,7 @@ import matplotlib
 
 matplotlib.use("Agg")
 
+import os
 import sys
 from pathlib import Path
 
@@ -11,7 +12,13 @@ import numpy as np
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from src.services.cad_renderer import decode_cad_text, render_drawing_region
+from src.services.cad_renderer import (
+    decode_cad_text,
+    entity_intersects_bbox,
+    load_dxf,
+    query_entities_in_bbox,
+    render_drawing_region,
+)
 
 
 def _image_non_white_ratio(image_path):
@@ -67,3 +74,75 @@ def test_decode_mif_encoded_text():
     )
     decoded = decode_cad_text(encoded)
     assert decoded == "\u56fa\u5b9a\u6321\u70df\u5782\u58c1\uff08\u9632\u706b\u5e03\uff09\u3001\u4f59\u540c"
+
+
+def test_load_dxf_reuses_document_until_file_changes(tmp_path):
+    dxf_path = tmp_path / "cached.dxf"
+    doc = ezdxf.new("R2018")
+    doc.modelspace().add_line((0, 0), (10, 10))
+    doc.saveas(dxf_path)
+
+    first = load_dxf(str(dxf_path))
+    assert load_dxf(str(dxf_path)) is first
+
+    doc.modelspace().add_line((0, 10), (10, 0))
+    doc.saveas(dxf_path)
+    os.utime(dxf_path, ns=(0, os.stat(dxf_path).st_mtime_ns + 1_000_000))
+
+    reloaded = load_dxf(str(dxf_path))
+    assert reloaded is not first
+    assert len(reloaded.modelspace()) == 2
+
+
+def test_query_entities_in_bbox_matches_per_entity_check(tmp_path):
+    dxf_path = tmp_path / "query.dxf"
+    doc = ezdxf.new("R2018")
+    block = doc.blocks.new(name="MARK")
+    block.add_circle((0, 0), radius=5)
+    msp = doc.modelspace()
+    msp.add_line((0, 0), (40, 0))
+    msp.add_line((200, 200), (300, 300))
+    msp.add_text("A", dxfattribs={"height": 10, "insert": (20, 20)})
+    msp.add_blockref("MARK", (60, 60))
+    doc.saveas(dxf_path)
+
+    bbox = {"x": 0, "y": 0, "width": 100, "height": 100}
+    found = query_entities_in_bbox(str(dxf_path), bbox)
+    assert [entity.dxftype() for entity in found] == ["LINE", "TEXT", "CIRCLE"]
+    assert all(entity_intersects_bbox(entity, bbox) for entity in found)
+
+
+def test_repeated_render_reuses_png_until_it_is_overwritten(tmp_path, monkeypatch):
+    import src.services.cad_renderer as cad_renderer
+
+    dxf_path = tmp_path / "repeat.dxf"
+    doc = ezdxf.new("R2018")
+    doc.modelspace().add_line((0, 0), (100, 100))
+    doc.saveas(dxf_path)
+
+    bbox = {"x": 0, "y": 0, "width": 100, "height": 100}
+    first_png = tmp_path / "first.png"
+    first = render_drawing_region(str(dxf_path), bbox=bbox, output_size=(200, 200), output_path=str(first_png))
+    assert first["success"], first
+
+    calls = []
+    real_render_entities = cad_renderer._render_entities
+    monkeypatch.setattr(
+        cad_renderer,
+        "_render_entities",
+        lambda *args, **kwargs: calls.append(1) or real_render_entities(*args, **kwargs),
+    )
+
+    second_png = tmp_path / "second.png"
+    second = render_drawing_region(str(dxf_path), bbox=bbox, output_size=(200, 200), output_path=str(second_png))
+    assert second["success"], second
+    assert second["image_path"] == str(second_png)
+    assert second["output_size"] == first["output_size"]
+    assert second_png.read_bytes() == first_png.read_bytes()
+    assert calls == []
+
+    # Another render wrote over the cached PNG: the cache entry must not be trusted.
+    first_png.write_bytes(b"not a png")
+    third = render_drawing_region(str(dxf_path), bbox=bbox, output_size=(200, 200), output_path=str(first_png))
+    assert third["success"], third
+    assert calls == [1]
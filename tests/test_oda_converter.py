@@ -0,0 +1,152 @@
+import os
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.services.oda_converter import ODAConverter
+
+_FAKE_ODA = """#!{python}
+import os
+import sys
+
+input_dir, output_dir, version = sys.argv[1:4]
+codes = {{"ACAD2013": "AC1027", "ACAD2018": "AC1032"}}
+with open(os.environ["FAKE_ODA_LOG"], "a") as log:
+    log.write(" ".join(sorted(os.listdir(input_dir))) + "\\n")
+for name in os.listdir(input_dir):
+    stem, extension = os.path.splitext(name)
+    if extension.lower() != ".dwg":
+        continue
+    with open(os.path.join(input_dir, name), "rb") as f:
+        content = f.read()
+    with open(os.path.join(output_dir, stem + ".dxf"), "wb") as f:
+        f.write(b"0\\nSECTION\\n2\\nHEADER\\n9\\n$ACADVER\\n1\\n" + codes[version].encode() + b"\\n")
+        f.write(content)
+"""
+
+
+@pytest.fixture
+def converter(tmp_path, monkeypatch):
+    oda_path = tmp_path / "fake_oda"
+    oda_path.write_text(_FAKE_ODA.format(python=sys.executable))
+    oda_path.chmod(oda_path.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("FAKE_ODA_LOG", str(tmp_path / "oda.log"))
+    monkeypatch.setenv("ODA_CACHE_DIR", str(tmp_path / "cache"))
+    return ODAConverter(oda_path=str(oda_path))
+
+
+def _oda_calls(tmp_path):
+    log_path = tmp_path / "oda.log"
+    return log_path.read_text().splitlines() if log_path.exists() else []
+
+
+def _make_dwg(path, content=b"dwg"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path
+
+
+def test_single_file_output_to_file_and_directory(tmp_path, converter):
+    dwg_path = _make_dwg(tmp_path / "src" / "plan.dwg")
+
+    target = tmp_path / "out" / "renamed.dxf"
+    target.parent.mkdir()
+    result = converter.convert_dwg_to_dxf(str(dwg_path), str(target))
+    assert result["success"], result
+    assert result["data"]["output_path"] == str(target)
+    assert target.read_bytes().endswith(b"dwg")
+
+    out_dir = tmp_path / "outdir"
+    out_dir.mkdir()
+    result = converter.convert_dwg_to_dxf(str(dwg_path), str(out_dir))
+    assert result["success"], result
+    assert result["data"]["output_path"] == str(out_dir / "plan.dxf")
+    assert os.listdir(out_dir) == ["plan.dxf"]
+    assert result["data"]["file_size"] == (out_dir / "plan.dxf").stat().st_size
+
+
+def test_uppercase_dwg_extension_is_converted(tmp_path, converter):
+    dwg_path = _make_dwg(tmp_path / "PLAN.DWG")
+
+    result = converter.convert_dwg_to_dxf(str(dwg_path))
+
+    assert result["success"], result
+    assert result["data"]["output_path"] == str(tmp_path / "PLAN.dxf")
+    assert (tmp_path / "PLAN.dxf").exists()
+
+
+def test_convert_many_rejects_colliding_targets(tmp_path, converter):
+    first = _make_dwg(tmp_path / "a" / "plan.dwg", b"first")
+    second = _make_dwg(tmp_path / "b" / "plan.dwg", b"second")
+    other = _make_dwg(tmp_path / "b" / "other.dwg", b"other")
+    out_dir = tmp_path / "out"
+
+    result = converter.convert_many([str(first), str(second), str(other)], str(out_dir))
+
+    assert not result["success"]
+    assert [item["dwg_path"] for item in result["data"]["files"]] == [str(first), str(other)]
+    assert [item["dwg_path"] for item in result["data"]["failed"]] == [str(second)]
+    assert (out_dir / "plan.dxf").read_bytes().endswith(b"first")
+    assert len(_oda_calls(tmp_path)) == 1
+
+
+def test_convert_many_parallel_shards_and_rejects_collisions(tmp_path, converter):
+    dwg_paths = [str(_make_dwg(tmp_path / "in" / f"part{index}.dwg", b"%d" % index)) for index in range(4)]
+    duplicate = str(_make_dwg(tmp_path / "dup" / "part0.dwg", b"dup"))
+    out_dir = tmp_path / "out"
+
+    result = converter.convert_many_parallel(dwg_paths + [duplicate], str(out_dir), workers=2)
+
+    assert result["data"]["files_converted"] == 4
+    assert [item["dwg_path"] for item in result["data"]["failed"]] == [duplicate]
+    assert sorted(os.listdir(out_dir)) == [f"part{index}.dxf" for index in range(4)]
+    assert len(_oda_calls(tmp_path)) == 2
+
+
+def test_identical_content_is_served_from_cache(tmp_path, converter):
+    first = _make_dwg(tmp_path / "a" / "plan.dwg", b"same")
+    second = _make_dwg(tmp_path / "b" / "copy.dwg", b"same")
+    changed = _make_dwg(tmp_path / "c" / "plan.dwg", b"changed")
+
+    assert converter.convert_dwg_to_dxf(str(first))["success"]
+    assert converter.convert_dwg_to_dxf(str(second))["success"]
+    assert len(_oda_calls(tmp_path)) == 1
+    assert (tmp_path / "b" / "copy.dxf").read_bytes() == (tmp_path / "a" / "plan.dxf").read_bytes()
+
+    assert converter.convert_dwg_to_dxf(str(changed))["success"]
+    assert len(_oda_calls(tmp_path)) == 2
+
+
+def test_cache_disabled_with_zero_max_bytes(tmp_path, converter, monkeypatch):
+    monkeypatch.setenv("ODA_CACHE_MAX_BYTES", "0")
+    first = _make_dwg(tmp_path / "a" / "plan.dwg", b"same")
+    second = _make_dwg(tmp_path / "b" / "plan.dwg", b"same")
+
+    assert converter.convert_dwg_to_dxf(str(first))["success"]
+    assert converter.convert_dwg_to_dxf(str(second))["success"]
+
+    assert len(_oda_calls(tmp_path)) == 2
+    assert not (tmp_path / "cache" / "oda_dxf_cache").exists()
+
+
+def test_fresh_output_is_reused_unless_forced_or_version_differs(tmp_path, converter, monkeypatch):
+    monkeypatch.setenv("ODA_CACHE_MAX_BYTES", "0")
+    dwg_path = _make_dwg(tmp_path / "plan.dwg")
+
+    assert converter.convert_dwg_to_dxf(str(dwg_path))["success"]
+    reused = converter.convert_dwg_to_dxf(str(dwg_path))
+    assert reused["success"] and reused["data"].get("cached")
+    assert len(_oda_calls(tmp_path)) == 1
+
+    forced = converter.convert_dwg_to_dxf(str(dwg_path), force=True)
+    assert forced["success"] and not forced["data"].get("cached")
+    assert len(_oda_calls(tmp_path)) == 2
+
+    downgraded = converter.convert_dwg_to_dxf(str(dwg_path), dxf_version="ACAD2013")
+    assert downgraded["success"] and not downgraded["data"].get("cached")
+    assert len(_oda_calls(tmp_path)) == 3
+    assert b"AC1027" in (tmp_path / "plan.dxf").read_bytes()
@@ -315,3 +315,30 @@ def test_sanitize_tool_result_handles_nested_base64_payload():
     assert sanitized["data"].get("image_base64_chars") == 60000
     assert len(sanitized["data"]["key_content"]["texts"]) == 20
     assert sanitized["data"]["key_content"]["texts_truncated"] == 10
+
+
+def test_build_messages_folds_turns_outside_history_window():
+    agent = MemoryDrivenAgent(db=_DummyDB(), fixed_skill_id="supervision")
+    agent.max_history_turns = 2
+
+    state = AgentState()
+    for turn in range(4):
+        state.add_message("user", f"question {turn}")
+        state.add_message(
+            "assistant",
+            "",
+            tool_calls=[{"id": f"call_{turn}", "type": "function", "function": {"name": "read_file", "arguments": "{}"}}],
+        )
+        state.add_message("tool", "{}", tool_call_id=f"call_{turn}")
+        state.add_message("assistant", f"answer {turn}")
+
+    messages = agent._build_messages(state, skill_prompt="")
+
+    assert messages[1]["role"] == "system"
+    assert "question 0" in messages[1]["content"]
+    assert "answer 1" in messages[1]["content"]
+    replayed = messages[2:]
+    assert replayed[0] == {"role": "user", "content": "question 2"}
+    assert len(replayed) == 8
+    tool_call_ids = {call["id"] for msg in replayed for call in msg.get("tool_calls", [])}
+    assert tool_call_ids == {msg["tool_call_id"] for msg in replayed if msg["role"] == "tool"}
@@ -0,0 +1,130 @@
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.services import vision_service
+
+_ANALYSIS_TEXT = "- 发现一\n- 发现二\n说明"
+
+
+def _response():
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=_ANALYSIS_TEXT))])
+
+
+class _FakeAsyncClient:
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=self)
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self.closed = False
+
+    async def create(self, **request):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return _response()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.closed = True
+
+
+class _FakeSyncClient:
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=self)
+        self.calls = 0
+
+    def create(self, **request):
+        self.calls += 1
+        return _response()
+
+
+@pytest.fixture
+def images(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    paths = []
+    for index in range(5):
+        path = tmp_path / f"region_{index}.png"
+        Image.new("RGB", (64, 48), "white").save(path)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def async_clients(monkeypatch):
+    clients = []
+
+    def create_client():
+        clients.append(_FakeAsyncClient())
+        return clients[-1]
+
+    monkeypatch.setattr(vision_service, "create_async_vision_client", create_client)
+    return clients
+
+
+def _assert_success_shape(result):
+    assert result["success"], result
+    assert set(result["data"]) == {"analysis_file", "summary", "key_findings", "full_length", "model_used"}
+    assert result["data"]["key_findings"] == ["发现一", "发现二"]
+    assert Path(result["data"]["analysis_file"]).exists()
+
+
+@pytest.mark.asyncio
+async def test_analyze_many_bounds_concurrency_and_closes_its_client(images, async_clients, monkeypatch):
+    monkeypatch.setattr(vision_service, "MAX_VISION_WORKERS", 2)
+
+    results = await vision_service.analyze_many(images + ["missing.png"], "识别文字")
+
+    assert len(results) == 6
+    for result in results[:5]:
+        _assert_success_shape(result)
+    assert not results[5]["success"]
+    assert "图片文件不存在" in results[5]["error"]
+
+    assert len(async_clients) == 1
+    client = async_clients[0]
+    assert client.calls == 5
+    assert client.peak == 2
+    assert client.closed
+
+
+@pytest.mark.asyncio
+async def test_single_async_analysis_owns_and_closes_a_client(images, async_clients):
+    result = await vision_service.analyze_drawing_visual_async(images[0], "识别文字")
+
+    _assert_success_shape(result)
+    assert len(async_clients) == 1
+    assert async_clients[0].closed
+
+
+@pytest.mark.asyncio
+async def test_analyze_many_reports_missing_api_key(images, monkeypatch):
+    monkeypatch.delenv("VISION_MODEL_API_KEY", raising=False)
+
+    results = await vision_service.analyze_many(images[:2], "识别文字")
+
+    assert [result["success"] for result in results] == [False, False]
+    assert all("VISION_MODEL_API_KEY" in result["error"] for result in results)
+
+
+def test_batch_analysis_keeps_input_order(images, monkeypatch):
+    client = _FakeSyncClient()
+    monkeypatch.setattr(vision_service, "get_vision_client", lambda: client)
+
+    results = vision_service.analyze_drawing_visual_batch(images, "识别文字")
+
+    assert client.calls == 5
+    for image_path, result in zip(images, results):
+        _assert_success_shape(result)
+        assert Path(image_path).stem in result["data"]["analysis_file"]